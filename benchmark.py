@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+from cassette import build_response
+from database_manager import DatabaseManager
+from http_client import HttpClient
+from live_entry import LiveEntry
+from notification_manager import NotificationManager
+from panda_monitor import PandaLiveMonitor
+from rate_limiter import PRIORITY_BACKGROUND, RateLimiter
+
+try:
+    import resource
+except ImportError:
+    # Windows没有resource模块，不统计峰值RSS
+    resource = None
+
+STAGES = ('update', 'check', 'process', 'db_read', 'db_lookup')
+DEFAULT_BASELINE = 'bench_baseline.json'
+
+def _make_item(index: int) -> Dict:
+    """生成一个列表页中的主播数据"""
+    return {
+        'code': index + 1,
+        'userId': f"bj{index:06d}",
+        'userNick': f"nick{index}",
+        'title': f"title {index}",
+        'startTime': f"2024-01-01 00:{index % 60:02d}:00",
+        'liveType': 'rec' if index % 20 == 0 else 'live',
+        'isPw': index % 50 == 0,
+        'isAdult': index % 17 == 0,
+        'type': 'fan' if index % 30 == 0 else 'free'
+    }
+
+class SyntheticHttpClient(HttpClient):
+    def __init__(self, items: List[Dict]):
+        """初始化合成数据客户端：不经过网络直接返回列表页，响应体按分页缓存，只测量解析和处理的开销"""
+        super().__init__(pool_size=1, limiter=RateLimiter(rate=0))
+        self.items = items
+        self._bodies: Dict[Tuple[int, int], bytes] = {}
+
+    def _page_body(self, params: Dict) -> bytes:
+        """获取（并缓存）指定分页的响应体"""
+        key = (int(params.get('offset', 0)), int(params.get('limit', 0)))
+        if key not in self._bodies:
+            offset, limit = key
+            self._bodies[key] = json.dumps({
+                'result': True,
+                'page': {'offset': offset, 'limit': limit, 'total': len(self.items)},
+                'list': self.items[offset:offset + limit]
+            }).encode('utf-8')
+        return self._bodies[key]
+
+    async def request(self, method: str, url: str, priority: int = PRIORITY_BACKGROUND,
+                      started: Optional[asyncio.Event] = None, **kwargs):
+        """返回合成的响应"""
+        if started is not None:
+            started.set()
+        response = build_response(url, 200, self._page_body(kwargs.get('params') or {}))
+        return response, self._record(url, 0.0, 200, len(response.content))
+
+class BenchmarkCase:
+    def __init__(self, temp_dir: str, entries: int, watched: int):
+        """准备一组基准测试数据：entries个在线主播的列表和watched个监控主播（约一半在线）"""
+        self.entries = entries
+        self.watched = watched
+        self.items = [_make_item(index) for index in range(entries)]
+
+        self.db = DatabaseManager(os.path.join(temp_dir, 'bench.db'))
+        self.db.set_config('cookie', 'benchmark')
+        # 一半监控主播均匀分布在列表中，另一半不在列表中（离线）
+        spacing = max(1, entries // ((watched + 1) // 2 or 1))
+        self.watched_mids = [
+            f"bj{(index // 2) * spacing % entries:06d}" if index % 2 == 0 else f"offline{index:06d}"
+            for index in range(watched)
+        ]
+        for mid in self.watched_mids:
+            self.db.add_vtb_to_watch(mid, mid)
+
+        notifier = NotificationManager()
+        notifier.set_notification_settings(False, False)
+        self.monitor = PandaLiveMonitor(self.db, notifier, http_client=SyntheticHttpClient(self.items))
+        # 固定分页大小，避免自动调整影响不同规模之间的对比
+        self.monitor.page_size_min = self.monitor.page_size_max = self.monitor.batch_size
+
+        entries_list = [LiveEntry.from_api(item) for item in self.items]
+        half = len(entries_list) // 2
+        # 两份快照的在线主播各不相同，交替使用时每次检查都有主播开播和下播
+        self.snapshots = (entries_list[:half], entries_list[half:])
+
+    def run_update(self, iteration: int):
+        """全量刷新一次列表"""
+        asyncio.run(self.monitor.update_all_streamers_data(full_sweep=True))
+
+    def run_check(self, iteration: int):
+        """用交替的快照检查一次监控主播"""
+        snapshot = self.snapshots[iteration % 2]
+        self.monitor._store_snapshot(snapshot, len(snapshot))
+        asyncio.run(self.monitor.check_watched_streamers(force=True))
+
+    def run_process(self, iteration: int):
+        """对每个监控主播执行一次开播和下播处理"""
+        entry = LiveEntry.from_api(_make_item(iteration))
+
+        async def process_all():
+            for vtb in self.db.get_all_watched_vtbs():
+                await self.monitor._process_online_streamer(vtb, entry)
+            await self.monitor.flush_pending_updates()
+            for vtb in self.db.get_all_watched_vtbs():
+                await self.monitor._process_offline_streamer(vtb)
+            await self.monitor.flush_pending_updates()
+
+        asyncio.run(process_all())
+
+    def run_db_read(self, iteration: int):
+        """读取一次监控列表"""
+        self.db.get_all_watched_vtbs()
+
+    def run_db_lookup(self, iteration: int):
+        """直接在SQLite中按mid查找每个监控主播，并重新加载一次监控列表（vtbs/watch连接）"""
+        def lookup_all():
+            conn = self.db._get_connection()
+            for mid in self.watched_mids:
+                conn.execute('SELECT 1 FROM watch WHERE mid = ?', (mid,)).fetchone()
+                conn.execute('SELECT liveStatus FROM vtbs WHERE mid = ?', (mid,)).fetchone()
+            self.db._reload_watch_cache()
+
+        self.db.submit(lookup_all).result()
+
+def _peak_rss_kib() -> Optional[float]:
+    """进程的峰值RSS（KiB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS返回字节数，Linux返回KiB
+    return peak / 1024 if sys.platform == 'darwin' else float(peak)
+
+def run_stage(stage: str, entries: int, watched: int, repeat: int) -> Dict:
+    """在当前进程中运行一个阶段（由独立子进程调用，保证峰值RSS只包含该阶段）"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        case = BenchmarkCase(temp_dir, entries, watched)
+        run = getattr(case, f"run_{stage}")
+        # 预热一次：填充响应缓存，并让检查阶段有初始状态
+        run(0)
+        rss_before = _peak_rss_kib()
+
+        timings = []
+        for iteration in range(1, repeat + 1):
+            gc.collect()
+            start_time = time.perf_counter()
+            run(iteration)
+            timings.append(time.perf_counter() - start_time)
+
+        # 单独运行一次统计内存分配（tracemalloc会拖慢计时，不与计时混在一起）
+        gc.collect()
+        tracemalloc.start()
+        run(repeat + 1)
+        allocated, alloc_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        rss_after = _peak_rss_kib()
+        case.monitor.close()
+        case.db.close()
+
+    return {
+        'stage': stage,
+        'entries': entries,
+        'watched': watched,
+        'wall_time': statistics.median(timings),
+        'wall_time_min': min(timings),
+        'alloc_peak_kib': alloc_peak / 1024,
+        'alloc_retained_kib': allocated / 1024,
+        'peak_rss_kib': rss_after,
+        'rss_growth_kib': rss_after - rss_before if rss_after is not None else None
+    }
+
+def _case_key(result: Dict) -> str:
+    return f"{result['stage']}/{result['entries']}/{result['watched']}"
+
+def _format_change(current: float, baseline: Optional[float]) -> str:
+    """格式化与基线的差异"""
+    if not baseline:
+        return '-'
+    return f"{(current - baseline) / baseline * 100:+.0f}%"
+
+def run_benchmarks(entries_list: List[int], watched_list: List[int], stages: List[str], repeat: int) -> List[Dict]:
+    """运行所有组合，每个阶段在新的子进程中运行"""
+    results = []
+    context = get_context('spawn')
+    for stage in stages:
+        for entries in entries_list:
+            for watched in watched_list:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(run_stage, stage, entries, watched, repeat).result()
+                results.append(result)
+                print(f"[BENCH] {_case_key(result)}: {result['wall_time'] * 1000:.1f}ms", file=sys.stderr)
+    return results
+
+def format_report(results: List[Dict], baseline: Dict[str, Dict], threshold: float) -> Tuple[str, List[str]]:
+    """生成报告表格，返回(报告, 超过阈值的退化项)"""
+    lines = [
+        f"{'stage':<10}{'entries':>10}{'watched':>10}{'wall ms':>13}{'change':>10}{'alloc KiB':>16}{'change':>10}{'RSS MiB':>15}",
+    ]
+    regressions = []
+    for result in results:
+        previous = baseline.get(_case_key(result), {})
+        rss = result['peak_rss_kib']
+        lines.append(
+            f"{result['stage']:<10}{result['entries']:>10}{result['watched']:>10}"
+            f"{result['wall_time'] * 1000:>13.2f}{_format_change(result['wall_time'], previous.get('wall_time')):>10}"
+            f"{result['alloc_peak_kib']:>16.1f}{_format_change(result['alloc_peak_kib'], previous.get('alloc_peak_kib')):>10}"
+            f"{(rss / 1024 if rss is not None else float('nan')):>15.1f}"
+        )
+        for metric in ('wall_time', 'alloc_peak_kib'):
+            if previous.get(metric) and result[metric] > previous[metric] * (1 + threshold):
+                regressions.append(f"{_case_key(result)} {metric}: {previous[metric]:.4g} -> {result[metric]:.4g}")
+    return "\n".join(lines), regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口，存在超过阈值的退化时返回1"""
+    parser = argparse.ArgumentParser(description="刷新与检查流程的基准测试")
+    parser.add_argument('--entries', default='1000,10000,50000', help="在线主播数量（逗号分隔）")
+    parser.add_argument('--watched', default='10,100,1000', help="监控主播数量（逗号分隔）")
+    parser.add_argument('--stages', default=','.join(STAGES), help=f"要运行的阶段: {','.join(STAGES)}")
+    parser.add_argument('--repeat', type=int, default=3, help="每个阶段的计时次数（取中位数）")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="基线文件")
+    parser.add_argument('--save-baseline', action='store_true', help="把本次结果保存为基线")
+    parser.add_argument('--threshold', type=float, default=0.2, help="判定为退化的增幅（0.2即20%%）")
+    parser.add_argument('--output', default=None, help="同时把报告写入文件")
+    args = parser.parse_args(argv)
+
+    stages = [stage for stage in args.stages.split(',') if stage]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"未知的阶段: {', '.join(unknown)}")
+
+    results = run_benchmarks(
+        [int(value) for value in args.entries.split(',')],
+        [int(value) for value in args.watched.split(',')],
+        stages, args.repeat
+    )
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+
+    report, regressions = format_report(results, baseline, args.threshold)
+    if regressions:
+        report += "\n\n[WARNING] 超过阈值的退化:\n" + "\n".join(f"  {item}" for item in regressions)
+    print(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + "\n")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': sys.version.split()[0],
+                'platform': sys.platform,
+                'results': {_case_key(result): result for result in results}
+            }, f, ensure_ascii=False, indent=2)
+        print(f"[OK] 基线已保存: {args.baseline}")
+
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,424 @@
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import selectors
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+import requests
+from database_manager import DatabaseManager
+from http_client import HttpClient
+from notification_manager import NotificationManager
+from panda_monitor import PandaLiveMonitor
+from rate_limiter import PRIORITY_BACKGROUND, RateLimiter
+
+CASSETTE_VERSION = 1
+LIVE_PATH = '/v1/live'
+MEMBER_PATH = '/v1/member/bj'
+
+# 录制时不保存的配置（账号和代理信息不应写入录制文件）
+_PRIVATE_CONFIGS = ('cookie', 'cookie_pool', 'proxy_enabled', 'proxy_url', 'proxy_pool')
+
+class VirtualClock:
+    def __init__(self, start: float = 0.0):
+        """初始化虚拟时钟（只在被拨动时前进）"""
+        self.now = start
+        self._lock = threading.Lock()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        """把时钟向前拨动seconds秒"""
+        with self._lock:
+            self.now += max(0.0, seconds)
+
+class _VirtualSelector:
+    """包装选择器：没有就绪事件时直接把虚拟时钟拨到下一个定时器，而不是真的等待"""
+
+    def __init__(self, selector: selectors.BaseSelector, clock: VirtualClock):
+        self._selector = selector
+        self._clock = clock
+        self.busy = 0  # 线程池中尚未完成的任务数
+
+    def select(self, timeout: Optional[float] = None):
+        if timeout is None or (self.busy and timeout > 0):
+            # 没有任何定时器、或线程池任务（如数据库写入）尚未完成时只能等待其它线程唤醒，
+            # 否则虚拟时钟会在任务完成前被拨到下一个定时器
+            return self._selector.select(None)
+        events = self._selector.select(0)
+        if not events and timeout > 0:
+            self._clock.advance(timeout)
+        return events
+
+    def __getattr__(self, name: str):
+        return getattr(self._selector, name)
+
+class VirtualClockEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock: VirtualClock):
+        """初始化使用虚拟时钟的事件循环：asyncio.sleep和超时都不真正等待"""
+        self.clock = clock
+        super().__init__(_VirtualSelector(selectors.DefaultSelector(), clock))
+
+    def time(self) -> float:
+        return self.clock()
+
+    def run_in_executor(self, executor, func, *args):
+        """线程池任务视为不消耗虚拟时间：完成前不推进虚拟时钟"""
+        future = super().run_in_executor(executor, func, *args)
+        self._selector.busy += 1
+
+        def on_done(_):
+            self._selector.busy -= 1
+
+        future.add_done_callback(on_done)
+        return future
+
+def request_key(path: str, params: Optional[Dict] = None, data: Optional[Dict] = None) -> Tuple:
+    """获取请求的匹配键：列表页按分页参数，主播信息按userId"""
+    params = params or {}
+    data = data or {}
+    if path == LIVE_PATH:
+        return ('live', int(params.get('offset', 0)), int(params.get('limit', 0)))
+    if path == MEMBER_PATH:
+        return ('bj', str(data.get('userId', '')))
+    return (path,)
+
+class CassetteRecorder:
+    def __init__(self, path: str, header: Optional[Dict] = None, clock: Callable[[], float] = time.monotonic):
+        """初始化录制器：每个请求的响应写成录制文件中的一行JSON"""
+        self.path = path
+        self.clock = clock
+        self.count = 0
+        self._start = clock()
+        self._lock = threading.Lock()
+        self._file = open(path, 'w', encoding='utf-8')
+        self._write({
+            'type': 'header',
+            'version': CASSETTE_VERSION,
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            **(header or {})
+        })
+
+    def _write(self, entry: Dict):
+        """写入一行记录"""
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def record(self, method: str, url: str, kwargs: Dict, status_code: int, body: bytes, elapsed: float):
+        """记录一次请求（可在HTTP工作线程中调用，请求头和代理不会被记录）"""
+        entry = {
+            'type': 'response',
+            't': round(self.clock() - self._start - elapsed, 3),  # 请求发出的时间（相对录制开始）
+            'method': method,
+            'path': urlparse(url).path,
+            'params': kwargs.get('params') or {},
+            'data': kwargs.get('data') or {},
+            'status': status_code,
+            'elapsed': round(elapsed, 4),
+            'body': body.decode('utf-8', errors='replace')
+        }
+        with self._lock:
+            if self._file.closed:
+                return
+            self._write(entry)
+            self.count += 1
+
+    def close(self):
+        """结束录制"""
+        with self._lock:
+            self._file.close()
+
+class Cassette:
+    def __init__(self, path: str):
+        """加载录制文件"""
+        self.path = path
+        self.header = {}
+        self.entries: List[Dict] = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if entry.get('type') == 'header':
+                    self.header = entry
+                else:
+                    self.entries.append(entry)
+        self.entries.sort(key=lambda entry: entry['t'])
+
+        # 按匹配键分组，组内按时间排序
+        self.by_key: Dict[Tuple, List[Dict]] = {}
+        for entry in self.entries:
+            key = request_key(entry['path'], entry['params'], entry['data'])
+            self.by_key.setdefault(key, []).append(entry)
+        self.times = {key: [entry['t'] for entry in entries] for key, entries in self.by_key.items()}
+
+        # 每轮列表刷新从一次成功的第一页开始
+        self.live_pages = [entry for entry in self.entries if entry['path'] == LIVE_PATH and entry['status'] < 400]
+        self.epoch_starts = [entry['t'] for entry in self.live_pages if int(entry['params'].get('offset', 0)) == 0]
+
+    @property
+    def duration(self) -> float:
+        """录制时长（秒）"""
+        if not self.entries:
+            return 0.0
+        return max(entry['t'] + entry['elapsed'] for entry in self.entries)
+
+def build_response(url: str, status_code: int, body: bytes) -> requests.Response:
+    """构建不经过网络的响应对象（回放和基准测试使用）"""
+    response = requests.Response()
+    response.status_code = status_code
+    response.url = url
+    response.reason = 'Replayed'
+    response.encoding = 'utf-8'
+    response.headers['Content-Type'] = 'application/json'
+    response._content = body
+    # 标记响应体已读取，iter_content直接从_content分块
+    response._content_consumed = True
+    return response
+
+class ReplayHttpClient(HttpClient):
+    def __init__(self, cassette: Cassette, clock: VirtualClock, lookahead: float = 2.0):
+        """初始化回放客户端：按虚拟时间从录制文件返回响应，请求耗时也按录制值在虚拟时间中等待"""
+        # 回放时不限流，限流器的定时器使用真实时间
+        super().__init__(pool_size=1, limiter=RateLimiter(rate=0, clock=clock))
+        self.cassette = cassette
+        self.clock = clock
+        self.lookahead = lookahead  # 允许提前回放的时间（用于匹配录制时的重试）
+        self._cursors: Dict[Tuple, int] = {}
+        self._epoch_cache: Dict[float, Tuple[Dict, List, float]] = {}
+        self.replayed = 0
+        self.synthesized = 0
+        self.missing = 0
+
+    def _next_entry(self, key: Tuple, now: float) -> Optional[Dict]:
+        """按顺序取出当前时间可回放的录制记录，落后太多时跳过过时的记录"""
+        entries = self.cassette.by_key.get(key)
+        if not entries:
+            return None
+        times = self.cassette.times[key]
+        last_due = bisect.bisect_right(times, now + self.lookahead) - 1
+        if last_due < 0:
+            # 还没到第一次录制的时间，使用最早的记录
+            index = 0
+        else:
+            first_fresh = bisect.bisect_left(times, now - self.lookahead)
+            index = min(max(self._cursors.get(key, 0), first_fresh), last_due)
+        self._cursors[key] = index + 1
+        return entries[index]
+
+    def _load_epoch(self, now: float) -> Optional[Tuple[Dict, List, float]]:
+        """合并当前时间所在的那一轮刷新中成功获取的所有页面"""
+        starts = self.cassette.epoch_starts
+        if not starts:
+            return None
+        index = max(0, bisect.bisect_right(starts, now) - 1)
+        start = starts[index]
+        if start in self._epoch_cache:
+            return self._epoch_cache[start]
+
+        end = starts[index + 1] if index + 1 < len(starts) else float('inf')
+        pages = sorted(
+            (entry for entry in self.cassette.live_pages if start <= entry['t'] < end),
+            key=lambda entry: int(entry['params'].get('offset', 0))
+        )
+        meta, items, seen_offsets = None, [], set()
+        for entry in pages:
+            offset = int(entry['params'].get('offset', 0))
+            if offset in seen_offsets:
+                continue
+            seen_offsets.add(offset)
+            body = json.loads(entry['body'])
+            page_items = body.pop('list', None) or []
+            if meta is None:
+                meta = body
+            # 页面之间有重叠时只追加新的部分
+            items.extend(page_items[max(0, len(items) - offset):])
+        elapsed = sum(entry['elapsed'] for entry in pages) / len(pages)
+        self._epoch_cache[start] = (meta or {}, items, elapsed)
+        return self._epoch_cache[start]
+
+    def _replay(self, method: str, url: str, kwargs: Dict) -> Tuple[requests.Response, float]:
+        """获取请求对应的回放响应和耗时"""
+        path = urlparse(url).path
+        key = request_key(path, kwargs.get('params'), kwargs.get('data'))
+        now = self.clock()
+
+        entry = self._next_entry(key, now)
+        if entry is not None:
+            self.replayed += 1
+            return build_response(url, entry['status'], entry['body'].encode('utf-8')), entry['elapsed']
+
+        # 分页大小和录制时不同：用同一轮刷新录制的页面拼出请求的分页
+        if key[0] == 'live':
+            epoch = self._load_epoch(now)
+            if epoch is not None:
+                meta, items, elapsed = epoch
+                _, offset, limit = key
+                body = dict(meta)
+                body['list'] = items[offset:offset + limit]
+                self.synthesized += 1
+                return build_response(url, 200, json.dumps(body, ensure_ascii=False).encode('utf-8')), elapsed
+
+        self.missing += 1
+        body = json.dumps({'result': False, 'message': 'not recorded'}).encode('utf-8')
+        return build_response(url, 200, body), 0.1
+
+    async def request(self, method: str, url: str, priority: int = PRIORITY_BACKGROUND,
+                      started: Optional[asyncio.Event] = None, **kwargs) -> Tuple[requests.Response, Dict]:
+        """回放请求"""
+        if started is not None:
+            started.set()
+        response, elapsed = self._replay(method, url, kwargs)
+        await asyncio.sleep(elapsed)
+        timing = self._record(url, elapsed, response.status_code, len(response.content))
+        timing['queued'] = 0.0
+        return response, timing
+
+    def get_replay_stats(self) -> Dict:
+        """获取回放统计"""
+        return {
+            'replayed': self.replayed,
+            'synthesized': self.synthesized,
+            'missing': self.missing
+        }
+
+def _copy_database(db_path: str, target_dir: str) -> DatabaseManager:
+    """复制数据库到临时目录，录制和回放都不修改原数据库"""
+    target = os.path.join(target_dir, os.path.basename(db_path))
+    shutil.copyfile(db_path, target)
+    return DatabaseManager(target)
+
+def _quiet_notifier() -> NotificationManager:
+    """创建不弹出桌面通知的通知管理器"""
+    notifier = NotificationManager()
+    notifier.set_notification_settings(False, False)
+    return notifier
+
+def record_session(cassette_path: str, db_path: str, duration: float,
+                   status_callback: Optional[Callable[[str], None]] = None) -> int:
+    """使用真实API运行监控duration秒，把响应录制到cassette_path，返回录制的请求数"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = _copy_database(db_path, temp_dir)
+        monitor = PandaLiveMonitor(db, _quiet_notifier())
+        if status_callback:
+            monitor.add_status_callback(status_callback)
+
+        header = {
+            'watched': [vtb.mid for vtb in db.get_all_watched_vtbs()],
+            'configs': {key: value for key, value in db.get_all_configs().items() if key not in _PRIVATE_CONFIGS}
+        }
+        recorder = CassetteRecorder(cassette_path, header)
+        monitor.http.recorder = recorder
+        try:
+            if monitor.start_monitoring():
+                time.sleep(duration)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if monitor.is_running:
+                monitor.stop_monitoring()
+            monitor.http.recorder = None
+            recorder.close()
+            monitor.close()
+            db.close()
+        return recorder.count
+
+def replay_session(cassette_path: str, db_path: Optional[str] = None, duration: Optional[float] = None,
+                   status_callback: Optional[Callable[[str], None]] = None) -> Dict:
+    """在虚拟时钟下回放录制文件，返回回放结果统计"""
+    cassette = Cassette(cassette_path)
+    clock = VirtualClock()
+    end_time = duration if duration is not None else cassette.duration + 1
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if db_path:
+            db = _copy_database(db_path, temp_dir)
+        else:
+            # 按录制时的监控列表和配置创建数据库
+            db = DatabaseManager(os.path.join(temp_dir, 'replay.db'))
+            for key, value in cassette.header.get('configs', {}).items():
+                db.set_config(key, value)
+            for mid in cassette.header.get('watched', []):
+                db.add_vtb_to_watch(mid, mid)
+        # 回放不需要真实账号，但刷新前会检查Cookie是否已设置
+        db.set_config('cookie', 'replay')
+        db.set_config('proxy_enabled', 'false')
+
+        client = ReplayHttpClient(cassette, clock)
+        counters = {'online': 0, 'offline': 0}
+
+        def on_status(message: str):
+            if message.startswith('[ONLINE]'):
+                counters['online'] += 1
+            elif message.startswith('[OFFLINE]'):
+                counters['offline'] += 1
+            if status_callback:
+                status_callback(f"[{clock():9.1f}s] {message}")
+
+        def stop_replay():
+            monitor.is_running = False
+            monitor.scheduler.wake()
+
+        def loop_factory() -> asyncio.AbstractEventLoop:
+            loop = VirtualClockEventLoop(clock)
+            loop.call_at(end_time, stop_replay)
+            return loop
+
+        monitor = PandaLiveMonitor(db, _quiet_notifier(), http_client=client, clock=clock, loop_factory=loop_factory)
+        monitor.add_status_callback(on_status)
+
+        started = time.perf_counter()
+        if monitor.start_monitoring():
+            monitor.monitor_thread.join()
+        real_duration = time.perf_counter() - started
+
+        result = {
+            'virtual_duration': clock(),
+            'real_duration': real_duration,
+            'speedup': clock() / real_duration if real_duration > 0 else None,
+            'update_cycles': monitor._update_cycle_count,
+            'check_cycles': monitor._check_cycle_count,
+            'online_events': counters['online'],
+            'offline_events': counters['offline'],
+            'replay': client.get_replay_stats(),
+            'http_stats': client.get_stats()
+        }
+        monitor.close()
+        db.close()
+        return result
+
+def main(argv: Optional[Iterable[str]] = None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="录制/回放PandaLive API响应")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help="使用真实API运行监控并录制响应")
+    record_parser.add_argument('cassette', help="录制文件路径")
+    record_parser.add_argument('--db', default='pd_signal.db', help="数据库路径（会先复制，不修改原文件）")
+    record_parser.add_argument('--duration', type=float, default=3600, help="录制时长（秒）")
+
+    replay_parser = subparsers.add_parser('replay', help="在虚拟时钟下回放录制文件")
+    replay_parser.add_argument('cassette', help="录制文件路径")
+    replay_parser.add_argument('--db', default=None, help="数据库路径（默认按录制时的监控列表创建）")
+    replay_parser.add_argument('--duration', type=float, default=None, help="回放的虚拟时长（秒）")
+    replay_parser.add_argument('--verbose', action='store_true', help="输出监控状态消息")
+
+    args = parser.parse_args(argv)
+    if args.command == 'record':
+        count = record_session(args.cassette, os.path.abspath(args.db), args.duration, status_callback=print)
+        print(f"[OK] 录制完成: {count}个请求 -> {args.cassette}")
+    else:
+        db_path = os.path.abspath(args.db) if args.db else None
+        result = replay_session(args.cassette, db_path, args.duration, status_callback=print if args.verbose else None)
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+
+if __name__ == '__main__':
+    main()
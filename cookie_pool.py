@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional
+
+# 请求结果
+OUTCOME_OK = 'ok'
+OUTCOME_EMPTY = 'empty'  # 请求成功但返回空数据（常见于Cookie失效）
+OUTCOME_ERROR = 'error'
+
+def parse_cookie_list(text: str) -> List[str]:
+    """解析按行分隔的Cookie列表（Cookie本身含有分号和逗号，只能按行分隔）"""
+    cookies = []
+    for line in text.splitlines():
+        cookie = line.strip()
+        if cookie and cookie != "Your Cookie" and cookie not in cookies:
+            cookies.append(cookie)
+    return cookies
+
+class CookieState:
+    """单个Cookie的使用情况"""
+    __slots__ = ('cookie', 'label', 'recent', 'in_flight', 'requests', 'errors', 'empty_results',
+                 'consecutive_failures', 'quarantined_until', 'quarantine_count')
+
+    def __init__(self, cookie: str, label: str):
+        """初始化Cookie状态"""
+        self.cookie = cookie
+        self.label = label
+        self.recent = deque()  # 统计窗口内的请求时间
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.empty_results = 0
+        self.consecutive_failures = 0
+        self.quarantined_until = 0.0
+        self.quarantine_count = 0
+
+class CookiePool:
+    def __init__(self, cookies: Iterable[str] = (), failure_threshold: int = 3, quarantine_timeout: float = 120.0,
+                 max_quarantine_timeout: float = 3600.0, window: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """初始化Cookie池：请求在可用Cookie之间轮换，连续出错或返回空数据的Cookie暂时隔离"""
+        self.failure_threshold = max(1, failure_threshold)
+        self.quarantine_timeout = quarantine_timeout
+        self.max_quarantine_timeout = max_quarantine_timeout
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._cookies: Dict[str, CookieState] = {}
+        self.set_cookies(cookies)
+
+    def set_cookies(self, cookies: Iterable[str]):
+        """更新Cookie列表，保留仍在列表中的Cookie的统计信息"""
+        with self._lock:
+            states = {}
+            for cookie in cookies:
+                if cookie and cookie not in states:
+                    state = self._cookies.get(cookie) or CookieState(cookie, "")
+                    # 标签只显示序号和末尾几个字符，避免在界面和日志中暴露完整Cookie
+                    state.label = f"#{len(states) + 1} ...{cookie[-6:]}"
+                    states[cookie] = state
+            self._cookies = states
+
+    def __len__(self) -> int:
+        return len(self._cookies)
+
+    def _trim(self, state: CookieState, now: float):
+        """移除统计窗口之外的请求记录（调用方需持有锁）"""
+        while state.recent and now - state.recent[0] > self.window:
+            state.recent.popleft()
+
+    def acquire(self) -> Optional[CookieState]:
+        """选择统计窗口内请求最少的可用Cookie，请求结束后需调用release"""
+        with self._lock:
+            if not self._cookies:
+                return None
+            now = self.clock()
+            for state in self._cookies.values():
+                self._trim(state, now)
+            available = [state for state in self._cookies.values() if state.quarantined_until <= now]
+            if available:
+                state = min(available, key=lambda item: (len(item.recent) + item.in_flight, item.consecutive_failures))
+            else:
+                # 全部被隔离时使用最早解除隔离的Cookie
+                state = min(self._cookies.values(), key=lambda item: item.quarantined_until)
+            state.recent.append(now)
+            state.requests += 1
+            state.in_flight += 1
+            return state
+
+    def release(self, state: Optional[CookieState], outcome: Optional[str]) -> bool:
+        """记录请求结果（outcome为None表示请求被取消），返回Cookie是否因此被隔离"""
+        if state is None:
+            return False
+        with self._lock:
+            state.in_flight = max(0, state.in_flight - 1)
+            if outcome is None:
+                return False
+            if outcome == OUTCOME_OK:
+                state.consecutive_failures = 0
+                if state.quarantined_until:
+                    state.quarantined_until = 0.0
+                    state.quarantine_count = 0
+                return False
+
+            if outcome == OUTCOME_EMPTY:
+                state.empty_results += 1
+            else:
+                state.errors += 1
+            state.consecutive_failures += 1
+            # 隔离到期后的第一次请求仍然失败时立即重新隔离
+            if state.quarantined_until or state.consecutive_failures >= self.failure_threshold:
+                timeout = min(self.max_quarantine_timeout, self.quarantine_timeout * (2 ** state.quarantine_count))
+                state.quarantined_until = self.clock() + timeout
+                state.quarantine_count += 1
+                return True
+            return False
+
+    def get_stats(self) -> List[Dict]:
+        """获取每个Cookie的统计信息"""
+        with self._lock:
+            now = self.clock()
+            stats = []
+            for state in self._cookies.values():
+                self._trim(state, now)
+                stats.append({
+                    'label': state.label,
+                    'requests_per_minute': len(state.recent) * 60.0 / self.window,
+                    'requests': state.requests,
+                    'errors': state.errors,
+                    'empty_results': state.empty_results,
+                    'quarantined': state.quarantined_until > now,
+                    'quarantine_remaining': max(0.0, state.quarantined_until - now)
+                })
+            return stats
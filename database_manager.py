@@ -1,8 +1,87 @@
 import sqlite3
+import asyncio
+import functools
 import os
 import sys
+import threading
+from concurrent.futures import Future
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple
+from db_executor import DatabaseExecutor
+from settings_store import CONFIG_DEFAULTS, SettingsStore, format_config_value
+from vtb_record import COLUMN_ATTRIBUTES, VtbRecord
+
+# 允许通过update_vtb_column更新的字段（列名无法作为SQL参数传入）
+_VTB_COLUMNS = ('username', 'usernick', 'liveStatus', 'title', 'platform', 'hls', 'remark')
+
+_WATCHED_VTBS_QUERY = '''
+    SELECT v.mid, v.username, v.usernick, v.liveStatus, v.title, v.platform, v.hls, v.remark
+    FROM vtbs v
+    INNER JOIN watch w ON v.mid = w.mid
+'''
+
+def _migrate_base_schema(cursor):
+    """版本1：基础表结构，以及旧版本数据库缺少的remark字段"""
+    # 创建vtbs表（主播信息表）
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vtbs (
+            mid TEXT NOT NULL,
+            username TEXT NOT NULL,
+            usernick TEXT,
+            liveStatus TEXT DEFAULT NULL,
+            title TEXT,
+            platform TEXT DEFAULT 'panda',
+            hls TEXT,
+            remark TEXT DEFAULT '',
+            PRIMARY KEY (mid, username)
+        )
+    ''')
+    
+    # 创建watch表（监控表）
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS watch (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mid TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # 创建config表（配置表）
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS config (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('PRAGMA table_info(vtbs)')
+    if 'remark' not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE vtbs ADD COLUMN remark TEXT DEFAULT ''")
+
+def _migrate_watch_mid_index(cursor):
+    """版本2：watch.mid唯一索引（先合并重复的监控记录，保留最早的一条）"""
+    cursor.execute('''
+        DELETE FROM watch WHERE id NOT IN (SELECT MIN(id) FROM watch GROUP BY mid)
+    ''')
+    # 覆盖按mid查询监控记录和vtbs/watch连接时的查找，只需读取索引
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_watch_mid ON watch (mid)')
+
+# 数据库迁移：(版本号, 迁移函数)，按顺序执行版本号大于PRAGMA user_version的迁移
+_MIGRATIONS = (
+    (1, _migrate_base_schema),
+    (2, _migrate_watch_mid_index),
+)
+SCHEMA_VERSION = _MIGRATIONS[-1][0]
+
+def _on_db_thread(method):
+    """让方法在数据库线程中执行；从其它线程调用时排队并等待结果"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.executor.is_executor_thread():
+            return method(self, *args, **kwargs)
+        return self.executor.submit(method, self, *args, **kwargs).result()
+    return wrapper
 
 class DatabaseManager:
     def __init__(self, db_path: str = "pd_signal.db"):
@@ -20,89 +99,180 @@ class DatabaseManager:
             self.db_path = os.path.join(app_dir, db_path)
         else:
             self.db_path = db_path
+        
+        # 所有SQLite操作在同一个数据库线程中按提交顺序执行，监控和界面只需排队而不争抢文件锁
+        self.executor = DatabaseExecutor()
+        
+        # 线程的长连接（正常只有数据库线程一个；执行器重启后旧线程的连接会被清理）
+        self._local = threading.local()
+        self._connections = {}  # 线程 -> 连接，用于清理已结束线程的连接
+        self._connections_lock = threading.Lock()
+        
+        # 监控列表的内存副本（mid -> 记录），读取时不访问数据库；
+        # 写入在数据库线程中完成并同步更新副本，保证副本与提交顺序一致
+        self._watch_cache: Dict[str, VtbRecord] = {}
+        # 按username排序的列表及mid -> 位置，增删主播后在下次读取时重新排序
+        self._watch_list: Optional[List[VtbRecord]] = None
+        self._watch_index: Dict[str, int] = {}
+        self._cache_lock = threading.Lock()
+        
+        # 配置的内存副本（按类型解析，set_config写入后更新并通知订阅者）
+        self.settings = SettingsStore()
             
         self.init_database()
+        self._load_settings()
+        self._reload_watch_cache()
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        """创建并配置一个新连接"""
+        # 连接只在创建它的线程中使用；关闭check_same_thread是为了能在线程结束后由其它线程关闭它
+        conn = sqlite3.connect(self.db_path, timeout=5.0, cached_statements=256, check_same_thread=False)
+        # WAL模式：读不阻塞写、写不阻塞读，提交时只追加日志
+        conn.execute('PRAGMA journal_mode=WAL')
+        # WAL模式下NORMAL只在检查点时同步磁盘，掉电最多丢失最后几次提交
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取当前线程的长连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._create_connection()
+            self._local.conn = conn
+            with self._connections_lock:
+                # 关闭已结束线程留下的连接
+                for thread in [thread for thread in self._connections if not thread.is_alive()]:
+                    self._connections.pop(thread).close()
+                self._connections[threading.current_thread()] = conn
+        return conn
+    
+    def _rollback(self):
+        """写入失败时回滚当前线程连接上未完成的事务"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and conn.in_transaction:
+            conn.rollback()
+    
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """在数据库线程中执行func，返回Future（供界面线程使用，不阻塞）"""
+        return self.executor.submit(func, *args, **kwargs)
     
+    def run(self, func: Callable, *args, **kwargs) -> Awaitable:
+        """在数据库线程中执行func，返回可等待对象（供监控的事件循环使用）"""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
+    def get_executor_stats(self) -> Dict:
+        """获取数据库线程的队列深度和耗时统计"""
+        return self.executor.get_stats()
+    
+    def close(self):
+        """停止数据库线程并关闭连接（之后再次访问数据库时会自动重新启动）"""
+        self.executor.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+    
+    @_on_db_thread
+    def _reload_watch_cache(self):
+        """从数据库加载监控列表副本"""
+        try:
+            cursor = self._get_connection().cursor()
+            cursor.execute(_WATCHED_VTBS_QUERY)
+            records = {}
+            for row in cursor.fetchall():
+                record = VtbRecord.from_row(row)
+                records.setdefault(record.mid, record)
+            with self._cache_lock:
+                self._watch_cache = records
+                self._watch_list = None
+        except Exception as e:
+            print(f"加载监控列表失败: {e}")
+    
+    def _patch_watch_cache(self, changes: Dict[str, Dict[str, str]]):
+        """按mid -> {列名: 值}更新监控列表副本中的记录（替换为新记录，不修改已返回给调用方的记录）"""
+        with self._cache_lock:
+            for mid, columns in changes.items():
+                record = self._watch_cache.get(mid)
+                if record is None:
+                    continue
+                record = record.replace(**{COLUMN_ATTRIBUTES[column]: value for column, value in columns.items()})
+                self._watch_cache[mid] = record
+                if self._watch_list is not None:
+                    if 'username' in columns:
+                        self._watch_list = None
+                    else:
+                        self._watch_list[self._watch_index[mid]] = record
+    
+    def _sorted_watch_list(self) -> List[VtbRecord]:
+        """获取按username排序的监控列表（调用方需持有_cache_lock）"""
+        if self._watch_list is None:
+            self._watch_list = sorted(self._watch_cache.values(), key=lambda record: (record.username, record.mid))
+            self._watch_index = {record.mid: index for index, record in enumerate(self._watch_list)}
+        return self._watch_list
+    
+    @_on_db_thread
+    def get_schema_version(self) -> int:
+        """获取数据库结构版本（PRAGMA user_version）"""
+        return self._get_connection().execute('PRAGMA user_version').fetchone()[0]
+    
+    @_on_db_thread
     def init_database(self):
-        """初始化数据库表结构"""
-        conn = sqlite3.connect(self.db_path)
+        """初始化数据库：执行尚未应用的迁移并写入默认配置"""
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        # 创建vtbs表（主播信息表）
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS vtbs (
-                mid TEXT NOT NULL,
-                username TEXT NOT NULL,
-                usernick TEXT,
-                liveStatus TEXT DEFAULT NULL,
-                title TEXT,
-                platform TEXT DEFAULT 'panda',
-                hls TEXT,
-                remark TEXT DEFAULT '',
-                PRIMARY KEY (mid, username)
-            )
-        ''')
+        version = self.get_schema_version()
+        if version > SCHEMA_VERSION:
+            print(f"[WARNING] 数据库版本({version})高于程序支持的版本({SCHEMA_VERSION})，可能由更新版本的程序创建")
         
-        # 创建watch表（监控表）
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS watch (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                mid TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 创建config表（配置表）
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS config (
-                key TEXT PRIMARY KEY,
-                value TEXT,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 检查并添加remark字段（数据库迁移）
-        try:
-            cursor.execute("ALTER TABLE vtbs ADD COLUMN remark TEXT DEFAULT ''")
-            conn.commit()
-        except sqlite3.OperationalError:
-            # 字段已存在，忽略错误
-            pass
+        for target, migrate in _MIGRATIONS:
+            if target <= version:
+                continue
+            # 每个迁移在单独的事务中执行，失败时回滚且不更新版本号
+            try:
+                cursor.execute('BEGIN')
+                migrate(cursor)
+                cursor.execute(f'PRAGMA user_version = {target}')
+                conn.commit()
+            except Exception:
+                self._rollback()
+                raise
         
         # 初始化默认配置
         self._init_default_configs(cursor)
         
         conn.commit()
-        conn.close()
     
     def _init_default_configs(self, cursor):
         """初始化默认配置"""
-        default_configs = {
-            'cookie': '',
-            'check_interval': '2',
-            'main_interval': '60',
-            'streamer_interval': '5',
-            'theme': 'dark',
-            'proxy_enabled': 'false',
-            'proxy_url': '',
-            'online_notification': 'true',
-            'offline_notification': 'true'
-        }
-        
-        for key, value in default_configs.items():
-            cursor.execute('SELECT * FROM config WHERE key = ?', (key,))
-            if not cursor.fetchone():
-                cursor.execute('INSERT INTO config (key, value) VALUES (?, ?)', (key, value))
+        cursor.executemany(
+            'INSERT OR IGNORE INTO config (key, value) VALUES (?, ?)',
+            [(key, format_config_value(value)) for key, value in CONFIG_DEFAULTS.items()]
+        )
+    
+    @_on_db_thread
+    def _load_settings(self):
+        """一次查询加载所有配置到内存副本"""
+        try:
+            cursor = self._get_connection().cursor()
+            cursor.execute('SELECT key, value FROM config')
+            self.settings.load({row[0]: row[1] for row in cursor.fetchall()})
+        except Exception as e:
+            print(f"加载配置失败: {e}")
     
+    @_on_db_thread
     def add_vtb_to_watch(self, mid: str, username: str, usernick: str = "", 
                         live_status: str = "", title: str = "", platform: str = "panda", hls: str = "", remark: str = "") -> bool:
         """添加主播到监控列表"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             
             # 检查主播是否已存在
-            cursor.execute('SELECT * FROM vtbs WHERE mid = ?', (mid,))
+            cursor.execute('SELECT 1 FROM vtbs WHERE mid = ?', (mid,))
             if not cursor.fetchone():
                 # 添加主播信息
                 cursor.execute('''
@@ -110,153 +280,140 @@ class DatabaseManager:
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (mid, username, usernick, live_status, title, platform, hls, remark))
             
-            # 检查是否已在监控列表中
-            cursor.execute('SELECT * FROM watch WHERE mid = ?', (mid,))
-            if not cursor.fetchone():
-                cursor.execute('INSERT INTO watch (mid) VALUES (?)', (mid,))
+            # 已在监控列表中时由watch.mid唯一索引忽略
+            cursor.execute('INSERT OR IGNORE INTO watch (mid) VALUES (?)', (mid,))
             
+            cursor.execute('''
+                SELECT mid, username, usernick, liveStatus, title, platform, hls, remark
+                FROM vtbs WHERE mid = ?
+            ''', (mid,))
+            row = cursor.fetchone()
             conn.commit()
-            conn.close()
+            
+            with self._cache_lock:
+                if row and mid not in self._watch_cache:
+                    self._watch_cache[mid] = VtbRecord.from_row(row)
+                    self._watch_list = None
             return True
         except Exception as e:
+            self._rollback()
             print(f"添加主播失败: {e}")
             return False
     
-    def get_vtb_by_mid(self, mid: str) -> Optional[Dict]:
-        """根据mid获取主播信息"""
+    def get_vtb_by_mid(self, mid: str) -> Optional[VtbRecord]:
+        """根据mid获取主播信息（监控中的主播直接从内存副本读取）"""
+        record = self._watch_cache.get(mid)
+        if record is not None:
+            return record
+        return self._query_vtb_by_mid(mid)
+    
+    @_on_db_thread
+    def _query_vtb_by_mid(self, mid: str) -> Optional[VtbRecord]:
+        """从数据库查询不在监控列表中的主播"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM vtbs WHERE mid = ?', (mid,))
+            cursor.execute('''
+                SELECT mid, username, usernick, liveStatus, title, platform, hls, remark
+                FROM vtbs WHERE mid = ?
+            ''', (mid,))
             row = cursor.fetchone()
-            conn.close()
-            
-            if row:
-                return {
-                    'mid': row[0],
-                    'username': row[1],
-                    'usernick': row[2],
-                    'liveStatus': row[3],
-                    'title': row[4],
-                    'platform': row[5],
-                    'hls': row[6],
-                    'remark': row[7] if len(row) > 7 else ''
-                }
-            return None
+            return VtbRecord.from_row(row) if row else None
         except Exception as e:
             print(f"获取主播信息失败: {e}")
             return None
     
-    def get_all_watched_vtbs(self) -> List[Dict]:
-        """获取所有监控的主播"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT v.* FROM vtbs v 
-                INNER JOIN watch w ON v.mid = w.mid
-                ORDER BY v.username
-            ''')
-            rows = cursor.fetchall()
-            conn.close()
-            
-            return [{
-                'mid': row[0],
-                'username': row[1],
-                'usernick': row[2],
-                'liveStatus': row[3],
-                'title': row[4],
-                'platform': row[5],
-                'hls': row[6],
-                'remark': row[7] if len(row) > 7 else ''
-            } for row in rows]
-        except Exception as e:
-            print(f"获取监控列表失败: {e}")
-            return []
+    def get_all_watched_vtbs(self) -> List[VtbRecord]:
+        """获取所有监控的主播（从内存副本读取，按username排序）"""
+        with self._cache_lock:
+            return list(self._sorted_watch_list())
+    
+    def is_watched(self, mid: str) -> bool:
+        """主播是否在监控列表中"""
+        return mid in self._watch_cache
+    
+    def get_watched_count(self) -> int:
+        """监控主播数量"""
+        return len(self._watch_cache)
     
     def update_vtb_remark(self, mid: str, remark: str) -> bool:
         """更新主播备注"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('UPDATE vtbs SET remark = ? WHERE mid = ?', (remark, mid))
-            conn.commit()
-            conn.close()
-            return True
-        except Exception as e:
-            print(f"更新主播备注失败: {e}")
-            return False
+        return self.update_vtb_column('remark', remark, mid)
     
     def update_vtb_column(self, column: str, value: str, mid: str) -> bool:
         """更新主播的某个字段"""
+        return self.update_vtb_columns([(column, value, mid)])
+    
+    @_on_db_thread
+    def update_vtb_columns(self, updates: List[Tuple[str, str, str]]) -> bool:
+        """批量更新主播字段，updates为(字段, 值, mid)列表，在同一个事务中提交"""
+        if not updates:
+            return True
+        # 按字段分组，每个字段一条executemany
+        grouped: Dict[str, List[Tuple[str, str]]] = {}
+        changes: Dict[str, Dict[str, str]] = {}
+        for column, value, mid in updates:
+            if column not in _VTB_COLUMNS:
+                print(f"更新主播信息失败: 未知字段 {column}")
+                return False
+            grouped.setdefault(column, []).append((value, mid))
+            changes.setdefault(mid, {})[column] = value
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
-            cursor.execute(f'UPDATE vtbs SET {column} = ? WHERE mid = ?', (value, mid))
+            for column, rows in grouped.items():
+                cursor.executemany(f'UPDATE vtbs SET {column} = ? WHERE mid = ?', rows)
             conn.commit()
-            conn.close()
+            self._patch_watch_cache(changes)
             return True
         except Exception as e:
+            self._rollback()
             print(f"更新主播信息失败: {e}")
             return False
     
+    @_on_db_thread
     def remove_from_watch(self, mid: str) -> bool:
         """从监控列表中移除主播"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             cursor.execute('DELETE FROM watch WHERE mid = ?', (mid,))
             
-            # 如果没有其他监控该主播，则删除主播信息
-            cursor.execute('SELECT * FROM watch WHERE mid = ?', (mid,))
-            if not cursor.fetchone():
-                cursor.execute('DELETE FROM vtbs WHERE mid = ?', (mid,))
+            # watch.mid唯一，删除后该主播不再被监控，同时删除主播信息
+            cursor.execute('DELETE FROM vtbs WHERE mid = ?', (mid,))
             
             conn.commit()
-            conn.close()
+            with self._cache_lock:
+                if self._watch_cache.pop(mid, None) is not None:
+                    self._watch_list = None
             return True
         except Exception as e:
+            self._rollback()
             print(f"移除监控失败: {e}")
             return False
     
+    @_on_db_thread
     def set_config(self, key: str, value: str) -> bool:
-        """设置配置项"""
+        """设置配置项（写入数据库后更新内存副本，值有变化时通知订阅者）"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._get_connection()
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT OR REPLACE INTO config (key, value, updated_at)
                 VALUES (?, ?, CURRENT_TIMESTAMP)
             ''', (key, value))
             conn.commit()
-            conn.close()
+            self.settings.update(key, value)
             return True
         except Exception as e:
+            self._rollback()
             print(f"设置配置失败: {e}")
             return False
     
     def get_config(self, key: str, default: str = "") -> str:
-        """获取配置项"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT value FROM config WHERE key = ?', (key,))
-            row = cursor.fetchone()
-            conn.close()
-            return row[0] if row else default
-        except Exception as e:
-            print(f"获取配置失败: {e}")
-            return default
+        """获取配置项的原始字符串（从内存副本读取）"""
+        return self.settings.get_raw(key, default)
     
     def get_all_configs(self) -> Dict[str, str]:
         """获取所有配置"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT key, value FROM config')
-            rows = cursor.fetchall()
-            conn.close()
-            return {row[0]: row[1] for row in rows}
-        except Exception as e:
-            print(f"获取所有配置失败: {e}")
-            return {}
+        return self.settings.snapshot()
@@ -0,0 +1,123 @@
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Optional
+
+class DatabaseExecutor(Executor):
+    def __init__(self, thread_name: str = 'DatabaseExecutor', clock: Callable[[], float] = time.perf_counter):
+        """初始化数据库执行器：所有任务按提交顺序在同一个专用线程中执行"""
+        self.thread_name = thread_name
+        self.clock = clock
+        self._queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()  # 在数据库线程中is_worker为True
+
+        # 统计信息（时间为真实耗时，与监控使用的时钟无关）
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+        self.max_run = 0.0
+
+    def is_executor_thread(self) -> bool:
+        """当前线程是否为数据库线程"""
+        return getattr(self._local, 'is_worker', False)
+
+    def _ensure_thread(self):
+        """按需启动数据库线程（调用方需持有锁），关闭后再次提交任务时重新启动"""
+        if self._thread is None:
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._worker, args=(self._queue,), name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """提交任务，返回concurrent.futures.Future"""
+        if self.is_executor_thread():
+            # 在数据库线程中提交的任务直接执行，避免等待自己造成死锁
+            future = Future()
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+
+        future = Future()
+        with self._lock:
+            self._ensure_thread()
+            self.submitted += 1
+            self._queue.put((future, fn, args, kwargs, self.clock()))
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future
+
+    def _worker(self, jobs: queue.Queue):
+        """数据库线程主循环"""
+        self._local.is_worker = True
+        while True:
+            item = jobs.get()
+            if item is None:
+                return
+            future, fn, args, kwargs, queued_at = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            started = self.clock()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+                success = False
+            else:
+                future.set_result(result)
+                success = True
+            finished = self.clock()
+
+            with self._lock:
+                wait, run = started - queued_at, finished - started
+                self.completed += 1
+                if not success:
+                    self.failed += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self.total_run += run
+                self.max_run = max(self.max_run, run)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        """停止数据库线程（已提交的任务会先执行完）"""
+        with self._lock:
+            thread, jobs = self._thread, self._queue
+            if thread is None:
+                return
+            if cancel_futures:
+                while True:
+                    try:
+                        item = jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                    item[0].cancel()
+            jobs.put(None)
+            # 之后提交的任务由新的线程和队列执行
+            self._thread = None
+        if wait and thread is not threading.current_thread():
+            thread.join()
+
+    def get_stats(self) -> Dict:
+        """获取队列深度和耗时统计（毫秒）"""
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'avg_wait_ms': self.total_wait / completed * 1000,
+                'max_wait_ms': self.max_wait * 1000,
+                'avg_run_ms': self.total_run / completed * 1000,
+                'max_run_ms': self.max_run * 1000
+            }
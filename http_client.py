@@ -0,0 +1,110 @@
+import asyncio
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import PRIORITY_BACKGROUND, RateLimiter, get_shared_limiter
+
+class HttpClient:
+    def __init__(self, pool_size: int = 10, history_size: int = 200, limiter: Optional[RateLimiter] = None):
+        """初始化HTTP客户端（持久连接池 + 线程池，供异步代码调用）"""
+        self.pool_size = pool_size
+        # 所有请求都经过进程内共享的限流器
+        self.limiter = limiter or get_shared_limiter()
+        self.session = requests.Session()
+        # 连接池复用TCP/TLS连接，避免每次请求重新握手
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='HttpClient')
+
+        # 请求耗时统计
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=history_size)
+        self.total_requests = 0
+        self.failed_requests = 0
+        self.busy_time = 0.0  # 所有请求累计耗时（秒）
+        self.last_timing = None
+
+        # 录制器（设置后每次请求的响应都会写入录制文件）
+        self.recorder = None
+
+    def _send(self, method: str, url: str, **kwargs) -> Tuple[requests.Response, Dict]:
+        """在工作线程中发送请求并记录耗时"""
+        start_time = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception:
+            self._record(url, time.perf_counter() - start_time, None, 0)
+            raise
+        elapsed = time.perf_counter() - start_time
+        timing = self._record(url, elapsed, response.status_code, len(response.content))
+        if self.recorder:
+            self.recorder.record(method, url, kwargs, response.status_code, response.content, elapsed)
+        return response, timing
+
+    def _record(self, url: str, elapsed: float, status_code: Optional[int], size: int) -> Dict:
+        """记录单次请求的耗时信息"""
+        timing = {
+            'url': url,
+            'elapsed': elapsed,
+            'status_code': status_code,
+            'bytes': size,
+            'timestamp': time.time()
+        }
+        with self._lock:
+            self.total_requests += 1
+            self.busy_time += elapsed
+            if status_code is None or status_code >= 400:
+                self.failed_requests += 1
+            else:
+                self.latencies.append(elapsed)
+            self.last_timing = timing
+        return timing
+
+    async def request(self, method: str, url: str, priority: int = PRIORITY_BACKGROUND,
+                      started: Optional[asyncio.Event] = None, **kwargs) -> Tuple[requests.Response, Dict]:
+        """异步发送请求，返回(响应, 耗时信息)，不阻塞事件循环；started在取得限流令牌、请求真正发出时置位"""
+        queued = await self.limiter.acquire(priority)
+        if started is not None:
+            started.set()
+        loop = asyncio.get_running_loop()
+        response, timing = await loop.run_in_executor(self.executor, lambda: self._send(method, url, **kwargs))
+        timing['queued'] = queued
+        return response, timing
+
+    def get_latency_percentile(self, percentile: float) -> Optional[float]:
+        """获取成功请求耗时的百分位数"""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def get_stats(self) -> Dict:
+        """获取请求统计信息"""
+        with self._lock:
+            samples = list(self.latencies)
+            total = self.total_requests
+            failed = self.failed_requests
+            busy_time = self.busy_time
+            last_timing = self.last_timing
+        return {
+            'total_requests': total,
+            'failed_requests': failed,
+            'busy_time': busy_time,
+            'avg_latency': sum(samples) / len(samples) if samples else None,
+            'p50_latency': self.get_latency_percentile(50),
+            'p90_latency': self.get_latency_percentile(90),
+            'last_timing': last_timing,
+            'rate_limiter': self.limiter.get_stats()
+        }
+
+    def close(self):
+        """关闭连接池和线程池"""
+        self.executor.shutdown(wait=False)
+        self.session.close()
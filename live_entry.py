@@ -0,0 +1,55 @@
+import sys
+from typing import Dict
+
+def _intern(value) -> str:
+    """驻留字符串，多次刷新之间相同的文本共用同一个对象"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    return '' if value is None else sys.intern(str(value))
+
+class LiveEntry:
+    """在线主播条目，只保留监控用到的字段"""
+    __slots__ = ('code', 'user_id', 'user_nick', 'title', 'start_time',
+                 'live_type', 'is_pw', 'is_adult', 'type', 'full_title')
+
+    def __init__(self, code, user_id: str, user_nick: str = "", title: str = "", start_time: str = "",
+                 live_type: str = "", is_pw: bool = False, is_adult: bool = False, type: str = ""):
+        """初始化主播条目"""
+        self.code = code
+        self.user_id = _intern(user_id)
+        self.user_nick = _intern(user_nick)
+        self.title = _intern(title)
+        self.start_time = _intern(start_time)
+        self.live_type = _intern(live_type)
+        self.is_pw = bool(is_pw)
+        self.is_adult = bool(is_adult)
+        self.type = _intern(type)
+        self.full_title = self._build_full_title()
+
+    @classmethod
+    def from_api(cls, item: Dict) -> 'LiveEntry':
+        """从API返回的主播数据创建条目"""
+        return cls(
+            code=item.get('code'),
+            user_id=item.get('userId'),
+            user_nick=item.get('userNick', ''),
+            title=item.get('title', ''),
+            start_time=item.get('startTime', ''),
+            live_type=item.get('liveType', ''),
+            is_pw=item.get('isPw'),
+            is_adult=item.get('isAdult'),
+            type=item.get('type', '')
+        )
+
+    def _build_full_title(self) -> str:
+        """构建带标识的完整标题"""
+        live_type = "🎥" if self.live_type == "rec" else ""
+        is_pw = "🔒" if self.is_pw else ""
+        is_adult = "🔞" if self.is_adult else ""
+        fan_type = "💰" if self.type == "fan" else ""
+        if not (live_type or is_pw or is_adult or fan_type):
+            return self.title
+        return _intern(f"{live_type}{fan_type}{is_pw}{is_adult}{self.title}")
+
+    def __repr__(self) -> str:
+        return f"LiveEntry(user_id={self.user_id!r}, user_nick={self.user_nick!r}, start_time={self.start_time!r})"
@@ -6,11 +6,14 @@ import logging
 import os
 import sys
 import socket
+from concurrent.futures import Future
 from datetime import datetime
 from database_manager import DatabaseManager
 from notification_manager import NotificationManager
 from panda_monitor import PandaLiveMonitor
 from user_settings import UserSettings
+from proxy_pool import parse_proxy_list
+from cookie_pool import parse_cookie_list
 
 class PDSignalApp:
     def __init__(self):
@@ -30,6 +33,7 @@ class PDSignalApp:
         self.online_streamers_list = None
         self.offline_streamers_list = None
         self.cookie_field = None
+        self.cookie_stats_text = None
         self.streamer_id_field = None
         self.streamer_remark_field = None
         self.interval_field = None
@@ -99,11 +103,12 @@ class PDSignalApp:
     def _load_notification_settings(self):
         """加载通知设置"""
         try:
-            online_notification = self.db.get_config("online_notification", "true").lower() == "true"
-            offline_notification = self.db.get_config("offline_notification", "true").lower() == "true"
+            online_notification = self.db.settings.get("online_notification")
+            offline_notification = self.db.settings.get("offline_notification")
             
-            # 设置通知管理器
+            # 设置通知管理器，之后配置变化时自动同步
             self.notifier.set_notification_settings(online_notification, offline_notification)
+            self.db.settings.subscribe(self._on_notification_config_changed, ('online_notification', 'offline_notification'))
             
             self.logger.info(f"通知设置已加载: 在线通知={'启用' if online_notification else '禁用'}, 离线通知={'启用' if offline_notification else '禁用'}")
         except Exception as e:
@@ -167,8 +172,12 @@ class PDSignalApp:
     
     def update_status_display(self):
         """更新状态显示"""
+        if not self.status_text and not self.cookie_stats_text:
+            return
+        
+        # 只获取一次监控状态，状态文本和Cookie统计共用
+        status = self.monitor.get_monitoring_status()
         if self.status_text:
-            status = self.monitor.get_monitoring_status()
             status_color = ft.Colors.GREEN if status['is_running'] else ft.Colors.RED
             status_text = "🟢 运行中" if status['is_running'] else "🔴 已停止"
             
@@ -179,12 +188,23 @@ class PDSignalApp:
                 f"🔴 离线: {status['offline_count']}"
             )
             self.status_text.color = status_color
+        
+        if self.cookie_stats_text:
+            cookie_stats = status.get('cookie_pool', [])
+            if len(cookie_stats) > 1:
+                self.cookie_stats_text.value = " | ".join(
+                    f"{'⛔' if stats['quarantined'] else '✅'} {stats['label']}: "
+                    f"{stats['requests_per_minute']:.0f}次/分, 错误{stats['errors']}, 空数据{stats['empty_results']}"
+                    for stats in cookie_stats
+                )
+            else:
+                self.cookie_stats_text.value = ""
     
     def update_streamer_list(self):
         """更新主播列表"""
         self.logger.info(f"更新主播列表: 监控状态={self.monitor.is_running}")
         
-        # 强制从数据库重新获取最新数据
+        # 监控列表由数据库管理器在内存中维护，读取不访问数据库
         watched_vtbs = self.db.get_all_watched_vtbs()
         self.logger.info(f"获取到 {len(watched_vtbs)} 个监控主播")
         
@@ -210,8 +230,8 @@ class PDSignalApp:
             return
         
         # 分离在线和离线主播
-        online_vtbs = [vtb for vtb in watched_vtbs if vtb['liveStatus']]
-        offline_vtbs = [vtb for vtb in watched_vtbs if not vtb['liveStatus']]
+        online_vtbs = [vtb for vtb in watched_vtbs if vtb.live_status]
+        offline_vtbs = [vtb for vtb in watched_vtbs if not vtb.live_status]
         
         current_online_count = len(online_vtbs)
         current_total_count = len(watched_vtbs)
@@ -310,12 +330,12 @@ class PDSignalApp:
                     content=ft.Container(
                         content=ft.Column([
                             ft.Row([
-                                ft.Text(vtb['username'], 
+                                ft.Text(vtb.username, 
                                        weight=ft.FontWeight.BOLD, size=14),
                                 ft.Row([
                                     ft.ElevatedButton(
                                         "✏️ 编辑备注",
-                                        on_click=self._create_edit_remark_handler(vtb['mid']),
+                                        on_click=self._create_edit_remark_handler(vtb.mid),
                                         bgcolor=self.get_theme_colors()['primary'],
                                         color=ft.Colors.WHITE,
                                         height=25,
@@ -323,7 +343,7 @@ class PDSignalApp:
                                     ),
                                     ft.ElevatedButton(
                                         "🗑️ 移除",
-                                        on_click=lambda e, mid=vtb['mid']: self.remove_streamer(mid),
+                                        on_click=lambda e, mid=vtb.mid: self.remove_streamer(mid),
                                         bgcolor=self.get_theme_colors()['error'],
                                         color=ft.Colors.WHITE,
                                         height=25,
@@ -331,15 +351,15 @@ class PDSignalApp:
                                     )
                                 ], spacing=5)
                             ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN)
-                        ] + ([ft.Text(f"备注: {vtb.get('remark', '')}", size=10, color=ft.Colors.BLUE_400)] if vtb.get('remark') else []), spacing=3),
+                        ] + ([ft.Text(f"备注: {vtb.remark}", size=10, color=ft.Colors.BLUE_400)] if vtb.remark else []), spacing=3),
                         padding=8
                     ),
                     margin=ft.margin.only(bottom=3)
                 )
             else:
                 # 在线/离线主播列：根据列表类型显示不同信息
-                status_icon = "🟢" if vtb['liveStatus'] else "🔴"
-                status_text = "在线" if vtb['liveStatus'] else "离线"
+                status_icon = "🟢" if vtb.live_status else "🔴"
+                status_text = "在线" if vtb.live_status else "离线"
                 
                 if title == "离线主播":
                     # 离线主播只显示ID和备注
@@ -347,13 +367,13 @@ class PDSignalApp:
                         content=ft.Container(
                             content=ft.Column([
                                 ft.Row([
-                                    ft.Text(f"{status_icon} {vtb['username']}", 
+                                    ft.Text(f"{status_icon} {vtb.username}", 
                                            weight=ft.FontWeight.BOLD, size=14),
                                     ft.Text(status_text, 
                                            color=ft.Colors.RED,
                                            size=12)
                                 ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN)
-                            ] + ([ft.Text(f"备注: {vtb.get('remark', '')}", size=10, color=ft.Colors.BLUE_400)] if vtb.get('remark') else []), spacing=3),
+                            ] + ([ft.Text(f"备注: {vtb.remark}", size=10, color=ft.Colors.BLUE_400)] if vtb.remark else []), spacing=3),
                             padding=8
                         ),
                         margin=ft.margin.only(bottom=3)
@@ -363,26 +383,26 @@ class PDSignalApp:
                     # 构建主要内容
                     main_content = [
                         ft.Row([
-                            ft.Text(f"{status_icon} {vtb['username']}", 
+                            ft.Text(f"{status_icon} {vtb.username}", 
                                    weight=ft.FontWeight.BOLD, size=14),
                             ft.Text(status_text, 
                                    color=ft.Colors.GREEN,
                                    size=12)
                         ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                        ft.Text(f"昵称: {vtb['usernick']}", size=11),
-                        ft.Text(f"标题: {vtb['title'][:30]}{'...' if len(vtb['title']) > 30 else ''}", 
+                        ft.Text(f"昵称: {vtb.usernick}", size=11),
+                        ft.Text(f"标题: {vtb.title[:30]}{'...' if len(vtb.title) > 30 else ''}", 
                                size=10, color=ft.Colors.GREY_400)
                     ]
                     
                     # 添加备注（如果有）
-                    if vtb.get('remark'):
-                        main_content.append(ft.Text(f"备注: {vtb.get('remark', '')}", size=10, color=ft.Colors.BLUE_400))
+                    if vtb.remark:
+                        main_content.append(ft.Text(f"备注: {vtb.remark}", size=10, color=ft.Colors.BLUE_400))
                     
                     # 添加播放按钮（在备注之后）
                     main_content.append(ft.Row([
                         ft.ElevatedButton(
                             "▶️ 播放直播",
-                            on_click=self._create_open_live_handler(vtb['mid']),
+                            on_click=self._create_open_live_handler(vtb.mid),
                             bgcolor=self.get_theme_colors()['primary'],
                             color=ft.Colors.WHITE,
                             height=25,
@@ -472,7 +492,7 @@ class PDSignalApp:
         # 创建编辑对话框
         remark_field = ft.TextField(
             label="备注",
-            value=vtb.get('remark', ''),
+            value=vtb.remark,
             multiline=True,
             max_lines=3,
             width=300,
@@ -589,7 +609,7 @@ class PDSignalApp:
         cookie = self.cookie_field.value.strip()
         if cookie:
             self.monitor.set_cookie(cookie)
-            self.add_log_message("[OK] Cookie已保存")
+            self.add_log_message(f"[OK] Cookie已保存 (共{len(self.monitor.cookie_pool)}个)")
             self.show_snackbar("Cookie已保存", ft.Colors.GREEN)
         else:
             self.add_log_message("[ERROR] Cookie为空，保存失败")
@@ -613,22 +633,22 @@ class PDSignalApp:
         """保存代理设置"""
         try:
             proxy_enabled = self.proxy_enabled_field.value if self.proxy_enabled_field else False
-            proxy_url = self.proxy_url_field.value.strip() if self.proxy_url_field else ""
+            # 多个代理用逗号分隔，第一个为首选代理，其余加入代理池
+            proxy_urls = parse_proxy_list(self.proxy_url_field.value) if self.proxy_url_field else []
             
             # 验证代理URL格式
-            if proxy_enabled and proxy_url:
-                if not proxy_url.startswith(('http://', 'https://')):
-                    proxy_url = f"http://{proxy_url}"
-                
-                # 简单验证URL格式
-                if '://' not in proxy_url or '.' not in proxy_url.split('://')[1]:
-                    self.add_log_message("[ERROR] 代理URL格式不正确")
-                    self.show_snackbar("代理URL格式不正确", ft.Colors.RED)
-                    return
+            if proxy_enabled:
+                for proxy_url in proxy_urls:
+                    # 简单验证URL格式
+                    if '.' not in proxy_url.split('://')[1]:
+                        self.add_log_message(f"[ERROR] 代理URL格式不正确: {proxy_url}")
+                        self.show_snackbar("代理URL格式不正确", ft.Colors.RED)
+                        return
             
-            self.monitor.set_proxy(proxy_enabled, proxy_url)
+            proxy_url = proxy_urls[0] if proxy_urls else ""
+            self.monitor.set_proxy(proxy_enabled, proxy_url, proxy_urls[1:])
             status_text = "启用" if proxy_enabled else "禁用"
-            proxy_info = f" ({proxy_url})" if proxy_enabled and proxy_url else ""
+            proxy_info = f" ({', '.join(proxy_urls)})" if proxy_enabled and proxy_urls else ""
             self.add_log_message(f"[SETTINGS] 代理设置已保存: {status_text}{proxy_info}")
             self.show_snackbar("代理设置已保存", ft.Colors.GREEN)
         except Exception as ex:
@@ -636,18 +656,24 @@ class PDSignalApp:
             self.add_log_message(f"[ERROR] {error_msg}")
             self.show_snackbar(error_msg, ft.Colors.RED)
     
+    def _on_notification_config_changed(self, key: str, value: bool):
+        """通知配置变化时更新通知管理器"""
+        self.notifier.set_notification_settings(
+            self.db.settings.get("online_notification"),
+            self.db.settings.get("offline_notification")
+        )
+    
     def save_notification_settings(self, e):
         """保存通知设置"""
         try:
             online_notification = self.online_notification_field.value if self.online_notification_field else True
             offline_notification = self.offline_notification_field.value if self.offline_notification_field else True
             
-            # 保存到数据库
-            self.db.set_config("online_notification", "true" if online_notification else "false")
-            self.db.set_config("offline_notification", "true" if offline_notification else "false")
-            
-            # 更新通知管理器设置
-            self.notifier.set_notification_settings(online_notification, offline_notification)
+            # 在数据库线程中保存（通知管理器通过配置订阅同步更新）
+            self._save_configs({
+                "online_notification": "true" if online_notification else "false",
+                "offline_notification": "true" if offline_notification else "false"
+            }, "通知设置")
             
             online_status = "启用" if online_notification else "禁用"
             offline_status = "启用" if offline_notification else "禁用"
@@ -658,6 +684,20 @@ class PDSignalApp:
             self.add_log_message(f"[ERROR] {error_msg}")
             self.show_snackbar(error_msg, ft.Colors.RED)
     
+    def _save_configs(self, values: dict, description: str) -> Future:
+        """在数据库线程中保存配置，不阻塞界面线程，失败时记录日志"""
+        def save() -> bool:
+            results = [self.db.set_config(key, value) for key, value in values.items()]
+            return all(results)
+        
+        def on_done(future):
+            if future.exception() or not future.result():
+                self.add_log_message(f"[ERROR] {description}保存失败")
+        
+        future = self.db.submit(save)
+        future.add_done_callback(on_done)
+        return future
+    
     def show_snackbar(self, message: str, color):
         """显示消息条"""
         if self.page:
@@ -673,7 +713,8 @@ class PDSignalApp:
         self.is_dark_theme = not self.is_dark_theme
         if self.page:
             self.page.theme_mode = ft.ThemeMode.DARK if self.is_dark_theme else ft.ThemeMode.LIGHT
-            self.db.set_config("theme", "dark" if self.is_dark_theme else "light")
+            # 重建界面时会读取保存的主题，需等待保存完成
+            self._save_configs({"theme": "dark" if self.is_dark_theme else "light"}, "主题设置").result()
             
             self.add_log_message(f"[THEME] 主题已切换为: {'暗色' if self.is_dark_theme else '亮色'}")
             
@@ -686,41 +727,37 @@ class PDSignalApp:
     
     def load_initial_data(self):
         """加载初始数据"""
+        settings = self.db.settings  # 配置的内存副本，不访问数据库
+        
         # 恢复Cookie设置
         if self.cookie_field:
-            saved_cookie = self.db.get_config("cookie", "")
+            saved_cookie = "\n".join(parse_cookie_list(f"{settings.get('cookie')}\n{settings.get('cookie_pool')}"))
             self.cookie_field.value = saved_cookie
         
         # 恢复间隔设置
         if self.interval_field:
-            saved_check_interval = self.db.get_config("check_interval", "2")
-            self.interval_field.value = saved_check_interval
+            self.interval_field.value = str(settings.get("check_interval"))
         
         if self.main_interval_field:
-            saved_main_interval = self.db.get_config("main_interval", "60")
-            self.main_interval_field.value = saved_main_interval
+            self.main_interval_field.value = str(settings.get("main_interval"))
         
         if self.streamer_interval_field:
-            saved_streamer_interval = self.db.get_config("streamer_interval", "5")
-            self.streamer_interval_field.value = saved_streamer_interval
+            self.streamer_interval_field.value = str(settings.get("streamer_interval"))
         
         # 恢复代理设置
         if self.proxy_enabled_field:
-            saved_proxy_enabled = self.db.get_config("proxy_enabled", "false").lower() == "true"
-            self.proxy_enabled_field.value = saved_proxy_enabled
+            self.proxy_enabled_field.value = settings.get("proxy_enabled")
         
         if self.proxy_url_field:
-            saved_proxy_url = self.db.get_config("proxy_url", "")
+            saved_proxy_url = ", ".join(parse_proxy_list(f"{settings.get('proxy_url')},{settings.get('proxy_pool')}"))
             self.proxy_url_field.value = saved_proxy_url
         
         # 恢复通知设置
         if self.online_notification_field:
-            saved_online_notification = self.db.get_config("online_notification", "true").lower() == "true"
-            self.online_notification_field.value = saved_online_notification
+            self.online_notification_field.value = settings.get("online_notification")
         
         if self.offline_notification_field:
-            saved_offline_notification = self.db.get_config("offline_notification", "true").lower() == "true"
-            self.offline_notification_field.value = saved_offline_notification
+            self.offline_notification_field.value = settings.get("offline_notification")
         
         # 恢复监控状态
         self.update_status_display()
@@ -850,14 +887,15 @@ class PDSignalApp:
         # 设置窗口事件监听
         page.on_window_event = self.on_window_event
         
-        # 加载配置
-        saved_cookie = self.monitor.get_cookie()
-        saved_check_interval = self.db.get_config("check_interval", "2")
-        saved_main_interval = self.db.get_config("main_interval", "60")
-        saved_streamer_interval = self.db.get_config("streamer_interval", "5")
-        saved_theme = self.db.get_config("theme", "dark")
-        saved_proxy_enabled = self.db.get_config("proxy_enabled", "false").lower() == "true"
-        saved_proxy_url = self.db.get_config("proxy_url", "")
+        # 加载配置（从内存副本读取，不访问数据库）
+        settings = self.db.settings
+        saved_cookie = "\n".join(parse_cookie_list(f"{self.monitor.get_cookie()}\n{settings.get('cookie_pool')}"))
+        saved_check_interval = str(settings.get("check_interval"))
+        saved_main_interval = str(settings.get("main_interval"))
+        saved_streamer_interval = str(settings.get("streamer_interval"))
+        saved_theme = settings.get("theme")
+        saved_proxy_enabled = settings.get("proxy_enabled")
+        saved_proxy_url = ", ".join(parse_proxy_list(f"{settings.get('proxy_url')},{settings.get('proxy_pool')}"))
         self.is_dark_theme = saved_theme == "dark"
         
         # 设置主题模式（在加载配置后）
@@ -911,13 +949,17 @@ class PDSignalApp:
         # Cookie设置
         self.cookie_field = ft.TextField(
             label="Cookie",
-            hint_text="从浏览器复制PandaLive的Cookie",
+            hint_text="从浏览器复制PandaLive的Cookie，多个账号每行一个",
             value=saved_cookie,
             password=False,
+            multiline=True,
+            max_lines=4,
             expand=True,
             border_radius=8
         )
         
+        self.cookie_stats_text = ft.Text("", size=12, color=colors['text_secondary'])
+        
         # 间隔设置
         self.interval_field = ft.TextField(
             label="检测间隔(秒)",
@@ -963,15 +1005,15 @@ class PDSignalApp:
         
         self.proxy_url_field = ft.TextField(
             label="代理地址",
-            hint_text="例如: 127.0.0.1:8080 或 http://127.0.0.1:8080",
+            hint_text="例如: 127.0.0.1:8080，多个代理用逗号分隔",
             value=saved_proxy_url,
             expand=True,
             border_radius=8
         )
         
         # 通知设置
-        saved_online_notification = self.db.get_config("online_notification", "true").lower() == "true"
-        saved_offline_notification = self.db.get_config("offline_notification", "true").lower() == "true"
+        saved_online_notification = settings.get("online_notification")
+        saved_offline_notification = settings.get("offline_notification")
         
         self.online_notification_field = ft.Checkbox(
             label="在线主播通知",
@@ -994,7 +1036,8 @@ class PDSignalApp:
                             ft.ElevatedButton("💾 保存", on_click=self.save_cookie, 
                                            bgcolor=colors['primary'], color=ft.Colors.WHITE,
                                            height=40)
-                        ], spacing=10)
+                        ], spacing=10),
+                        self.cookie_stats_text
                     ], spacing=8),
                     bgcolor=colors['surface'],
                     padding=15,
@@ -1252,13 +1295,13 @@ class PDSignalApp:
         # 检查代理状态
         proxy_status = self.monitor.get_monitoring_status()
         if proxy_status.get('proxy_enabled'):
-            proxy_url = proxy_status.get('proxy_url', '')
-            self.add_log_message(f"[PROXY] 当前代理状态: 已启用 ({proxy_url})")
+            proxy_urls = [proxy['url'] for proxy in proxy_status.get('proxy_pool', [])]
+            self.add_log_message(f"[PROXY] 当前代理状态: 已启用 ({', '.join(proxy_urls)})")
         else:
             self.add_log_message("[PROXY] 当前代理状态: 未启用，使用直连")
         
         # 检查监控列表
-        watched_count = len(self.db.get_all_watched_vtbs())
+        watched_count = self.db.get_watched_count()
         self.add_log_message(f"[LIST] 当前监控主播数量: {watched_count}")
         
         page.update()
@@ -1313,6 +1356,10 @@ class PDSignalApp:
             self.save_window_settings()
             print("[SHUTDOWN] 窗口设置已保存")
             
+            # 释放监控器资源，再关闭数据库连接（WAL内容在最后一个连接关闭时写回主数据库文件）
+            self.monitor.close()
+            self.db.close()
+            
             print("[SHUTDOWN] 安全关闭完成")
         except Exception as e:
             print(f"[SHUTDOWN] 安全关闭时出错: {e}")
@@ -1327,6 +1374,8 @@ class PDSignalApp:
             # 保存窗口设置
             self.save_window_settings()
             
+            self.monitor.close()
+            self.db.close()
             self.add_log_message("[CLEANUP] 程序清理完成")
         except Exception as e:
             print(f"清理资源时出错: {e}")
@@ -0,0 +1,329 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+class LatencyModel:
+    KINDS = ('fixed', 'uniform', 'lognormal')
+
+    def __init__(self, kind: str = 'lognormal', base: float = 0.15, spread: float = 0.5, per_item: float = 0.0005,
+                 slow_rate: float = 0.0, slow_factor: float = 10.0):
+        """初始化响应延迟分布：base为中位数，per_item为每个条目额外耗时，slow_rate的请求会慢slow_factor倍"""
+        if kind not in self.KINDS:
+            raise ValueError(f"未知的延迟分布: {kind}")
+        self.kind = kind
+        self.base = base
+        self.spread = spread
+        self.per_item = per_item
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+
+    def sample(self, rng: random.Random, items: int = 0) -> float:
+        """抽取一次响应延迟（秒）"""
+        if self.kind == 'fixed':
+            delay = self.base
+        elif self.kind == 'uniform':
+            delay = rng.uniform(self.base * (1 - self.spread), self.base * (1 + self.spread))
+        else:
+            delay = self.base * rng.lognormvariate(0, self.spread)
+        delay += self.per_item * items
+        if self.slow_rate and rng.random() < self.slow_rate:
+            delay *= self.slow_factor
+        return max(0.0, delay)
+
+class Population:
+    def __init__(self, size: int = 20000, live_ratio: float = 0.15, churn: float = 0.2, churn_period: float = 5.0,
+                 time_scale: float = 1.0, seed: int = 1, clock: Callable[[], float] = time.time):
+        """初始化模拟主播群体：每个频道按各自的周期开播/下播，热度排名随时间抖动"""
+        rng = random.Random(seed)
+        self.size = size
+        self.churn = churn
+        self.churn_period = churn_period
+        self.time_scale = time_scale
+        self.clock = clock
+        self._epoch = clock()
+
+        # 用并行列表保存频道属性，几万个频道也只占少量内存
+        self.user_ids = [f"bj{index:06d}" for index in range(size)]
+        self.weights = [rng.paretovariate(1.2) for _ in range(size)]  # 热度，长尾分布
+        self.periods = [rng.uniform(2 * 3600, 12 * 3600) for _ in range(size)]  # 开播周期（秒）
+        self.phases = [rng.random() for _ in range(size)]
+        self.duties = [min(0.95, max(0.01, rng.uniform(0.5, 1.5) * live_ratio)) for _ in range(size)]
+        self.flags = [rng.random() for _ in range(size)]
+
+        self._lock = threading.Lock()
+        self._ranking_bucket = None
+        self._ranking: List[int] = []
+
+    def now(self) -> float:
+        """模拟时间（按time_scale加速，让开播/下播更频繁）"""
+        return self._epoch + (self.clock() - self._epoch) * self.time_scale
+
+    def _cycle(self, index: int, now: float) -> Tuple[int, float]:
+        """频道当前所在周期的序号和周期内进度"""
+        position = now / self.periods[index] + self.phases[index]
+        cycle = math.floor(position)
+        return cycle, position - cycle
+
+    def is_live(self, index: int, now: float) -> bool:
+        """频道当前是否在直播"""
+        return self._cycle(index, now)[1] < self.duties[index]
+
+    def start_time(self, index: int, now: float) -> str:
+        """频道本次开播时间"""
+        cycle, _ = self._cycle(index, now)
+        started = (cycle - self.phases[index]) * self.periods[index]
+        return datetime.fromtimestamp(started).strftime('%Y-%m-%d %H:%M:%S')
+
+    def ranking(self) -> List[int]:
+        """按热度排序的在线频道；每个抖动周期重新排序一次，翻页期间排名可能变化"""
+        now = self.now()
+        bucket = int(now / self.churn_period) if self.churn_period > 0 else 0
+        with self._lock:
+            if bucket != self._ranking_bucket:
+                live = [index for index in range(self.size) if self.is_live(index, now)]
+
+                def score(index: int) -> float:
+                    # 简单的整数哈希作为可重复的噪声
+                    noise = ((index * 2654435761 + bucket * 40503) % 1000) / 1000 - 0.5
+                    return self.weights[index] * (1 + self.churn * noise)
+
+                live.sort(key=score, reverse=True)
+                self._ranking_bucket = bucket
+                self._ranking = live
+            return self._ranking
+
+    def find(self, user_id: str) -> Optional[int]:
+        """根据userId查找频道"""
+        if not user_id.startswith('bj') or not user_id[2:].isdigit():
+            return None
+        index = int(user_id[2:])
+        return index if index < self.size else None
+
+    def live_item(self, index: int, now: float) -> Dict:
+        """构建/v1/live列表中的主播条目"""
+        flag = self.flags[index]
+        return {
+            'code': index + 1,
+            'userId': self.user_ids[index],
+            'userNick': f"모의방송{index}",
+            'title': f"테스트 방송 #{index}",
+            'startTime': self.start_time(index, now),
+            'liveType': 'rec' if flag < 0.05 else 'live',
+            'isPw': 0.05 <= flag < 0.07,
+            'isAdult': 0.07 <= flag < 0.12,
+            'type': 'fan' if 0.12 <= flag < 0.15 else 'free',
+            'user': round(self.weights[index] * 100)
+        }
+
+class MockApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], population: Population, latency: LatencyModel,
+                 error_rate: float = 0.0, hang_rate: float = 0.0, hang_time: float = 30.0,
+                 throttle_rate: float = 0.0, throttle_burst: int = 20, seed: int = 1, max_page_size: int = 0):
+        """初始化模拟PandaLive API服务器（可注入延迟、错误、超时和限流）"""
+        super().__init__(address, MockApiHandler)
+        self.population = population
+        self.latency = latency
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_time = hang_time
+        self.throttle_rate = throttle_rate
+        self.throttle_burst = max(1, throttle_burst)
+        self.max_page_size = max_page_size  # 大于0时限制每页返回的最大数量
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(self.throttle_burst)
+        self._tokens_updated = time.monotonic()
+        self.stats = {'requests': 0, 'live': 0, 'member': 0, 'errors': 0, 'hangs': 0, 'throttled': 0, 'bytes': 0}
+
+    @property
+    def base_url(self) -> str:
+        """服务器地址（设置为监控的api_base_url）"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def random(self) -> float:
+        """线程安全的随机数"""
+        with self._lock:
+            return self._rng.random()
+
+    def sample_latency(self, items: int = 0) -> float:
+        """线程安全地抽取响应延迟"""
+        with self._lock:
+            return self.latency.sample(self._rng, items)
+
+    def count(self, key: str, amount: int = 1):
+        """累加统计"""
+        with self._lock:
+            self.stats[key] += amount
+
+    def take_token(self) -> bool:
+        """令牌桶限流，返回是否放行"""
+        if self.throttle_rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.throttle_burst), self._tokens + (now - self._tokens_updated) * self.throttle_rate)
+            self._tokens_updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: MockApiServer
+
+    def log_message(self, format: str, *args):
+        """不输出每个请求的访问日志"""
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+        """发送JSON响应"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端已超时断开（如注入的长时间不响应）
+            self.close_connection = True
+            return
+        self.server.count('bytes', len(body))
+
+    def _inject_faults(self) -> bool:
+        """按配置注入限流、错误和超时，已经发送响应时返回True"""
+        server = self.server
+        server.count('requests')
+        if not server.take_token():
+            server.count('throttled')
+            self._send_json(429, {'result': False, 'message': 'Too Many Requests'}, {'Retry-After': '1'})
+            return True
+        if server.hang_rate and server.random() < server.hang_rate:
+            server.count('hangs')
+            time.sleep(server.hang_time)
+        if server.error_rate and server.random() < server.error_rate:
+            server.count('errors')
+            status = (500, 502, 503)[int(server.random() * 3)]
+            time.sleep(server.sample_latency())
+            self._send_json(status, {'result': False, 'message': 'Injected error'})
+            return True
+        return False
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == '/_stats':
+            self._send_json(200, dict(self.server.stats))
+            return
+        if parsed.path != '/v1/live':
+            self._send_json(404, {'result': False, 'message': 'Not Found'})
+            return
+        if self._inject_faults():
+            return
+
+        params = parse_qs(parsed.query)
+        offset = max(0, int(params.get('offset', ['0'])[0]))
+        limit = max(0, int(params.get('limit', ['96'])[0]))
+        if self.server.max_page_size > 0:
+            limit = min(limit, self.server.max_page_size)
+        population = self.server.population
+        ranking = population.ranking()
+        now = population.now()
+        items = [population.live_item(index, now) for index in ranking[offset:offset + limit]]
+
+        time.sleep(self.server.sample_latency(len(items)))
+        self.server.count('live')
+        self._send_json(200, {
+            'result': True,
+            'page': {'offset': offset, 'limit': limit, 'total': len(ranking)},
+            'list': items
+        })
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8')) if length else {}
+        if parsed.path != '/v1/member/bj':
+            self._send_json(404, {'result': False, 'message': 'Not Found'})
+            return
+        if self._inject_faults():
+            return
+
+        population = self.server.population
+        user_id = form.get('userId', [''])[0]
+        index = population.find(user_id)
+        time.sleep(self.server.sample_latency())
+        self.server.count('member')
+        if index is None:
+            self._send_json(200, {'result': False, 'message': '존재하지 않는 회원입니다.'})
+            return
+
+        now = population.now()
+        media = population.live_item(index, now) if population.is_live(index, now) else None
+        self._send_json(200, {
+            'result': True,
+            'bjInfo': {'id': user_id, 'nick': f"모의방송{index}"},
+            'media': media
+        })
+
+def start_server(host: str = '127.0.0.1', port: int = 0, **kwargs) -> MockApiServer:
+    """在后台线程启动模拟服务器（port为0时自动分配端口），用于压力测试脚本"""
+    population = kwargs.pop('population', None) or Population()
+    latency = kwargs.pop('latency', None) or LatencyModel()
+    server = MockApiServer((host, port), population, latency, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True, name='MockApiServer').start()
+    return server
+
+def main(argv: Optional[List[str]] = None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="本地模拟PandaLive API服务器（用于压力和容错测试）")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--population', type=int, default=20000, help="频道总数")
+    parser.add_argument('--live-ratio', type=float, default=0.15, help="平均在线比例")
+    parser.add_argument('--churn', type=float, default=0.2, help="热度排名抖动幅度")
+    parser.add_argument('--churn-period', type=float, default=5.0, help="排名重新计算的间隔（秒）")
+    parser.add_argument('--time-scale', type=float, default=1.0, help="开播/下播的时间加速倍数")
+    parser.add_argument('--latency', choices=LatencyModel.KINDS, default='lognormal', help="延迟分布")
+    parser.add_argument('--latency-base', type=float, default=0.15, help="延迟中位数（秒）")
+    parser.add_argument('--latency-spread', type=float, default=0.5, help="延迟离散程度")
+    parser.add_argument('--per-item', type=float, default=0.0005, help="每个条目额外耗时（秒）")
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="长尾慢请求比例")
+    parser.add_argument('--slow-factor', type=float, default=10.0, help="慢请求的延迟倍数")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="返回5xx错误的比例")
+    parser.add_argument('--hang-rate', type=float, default=0.0, help="长时间不响应的比例")
+    parser.add_argument('--hang-time', type=float, default=30.0, help="不响应的时长（秒）")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="每秒允许的请求数，超出返回429（0为不限流）")
+    parser.add_argument('--throttle-burst', type=int, default=20, help="限流突发数")
+    parser.add_argument('--max-page-size', type=int, default=0, help="每页最多返回的条目数（0为不限制）")
+    args = parser.parse_args(argv)
+
+    population = Population(args.population, args.live_ratio, args.churn, args.churn_period, args.time_scale, args.seed)
+    latency = LatencyModel(args.latency, args.latency_base, args.latency_spread, args.per_item,
+                           args.slow_rate, args.slow_factor)
+    server = MockApiServer((args.host, args.port), population, latency, args.error_rate, args.hang_rate,
+                           args.hang_time, args.throttle_rate, args.throttle_burst, args.seed, args.max_page_size)
+    print(f"[OK] 模拟API已启动: {server.base_url} (将配置api_base_url设置为此地址)")
+    print(f"[STATS] 频道总数: {args.population} | 当前在线: {len(population.ranking())}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[STATS] {json.dumps(server.stats)}")
+
+if __name__ == '__main__':
+    main()
@@ -1,34 +1,121 @@
 import asyncio
 import json
 import time
-import requests
 import logging
 import os
 import sys
 from datetime import datetime
-from typing import List, Dict, Optional, Callable
+from typing import List, Dict, Optional, Callable, Set, Tuple
 import threading
+from collections import deque
+import requests
 from database_manager import DatabaseManager
 from notification_manager import NotificationManager
+from http_client import HttpClient
+from scheduler import DeadlineScheduler
+from live_entry import LiveEntry
+from vtb_record import VtbRecord
+from resilience import CircuitBreaker, RetryPolicy
+from rate_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_PROBE
+from proxy_pool import ProxyPool, normalize_proxy_url, parse_proxy_list
+from cookie_pool import OUTCOME_EMPTY, OUTCOME_ERROR, OUTCOME_OK, CookiePool, parse_cookie_list
+
+DEFAULT_API_BASE_URL = "https://api.pandalive.co.kr"
+
+# 修改后立即生效的调优配置项
+TUNING_CONFIG_KEYS = (
+    'page_concurrency', 'full_sweep_every', 'page_size_min', 'page_size_max',
+    'hedge_enabled', 'hedge_max_fraction', 'retry_attempts', 'rate_limit_rps', 'rate_limit_burst'
+)
 
 class PandaLiveMonitor:
-    def __init__(self, db_manager: DatabaseManager, notification_manager: NotificationManager):
-        """初始化PandaLive监控器"""
+    def __init__(self, db_manager: DatabaseManager, notification_manager: NotificationManager,
+                 http_client: Optional[HttpClient] = None, clock: Callable[[], float] = time.monotonic,
+                 loop_factory: Callable[[], asyncio.AbstractEventLoop] = asyncio.new_event_loop):
+        """初始化PandaLive监控器（http_client、clock和loop_factory可替换为回放用的实现）"""
         self.db = db_manager
+        self.clock = clock
+        self.loop_factory = loop_factory
         self.notifier = notification_manager
         self.is_running = False
         self.monitor_thread = None
         self.cookie = ""
-        self.check_interval = int(self.db.get_config("check_interval", "2"))  # 检测间隔（秒）
-        self.main_interval = int(self.db.get_config("main_interval", "60"))  # 获取列表间隔（秒）
-        self.streamer_interval = int(self.db.get_config("streamer_interval", "5"))  # 主播间检测间隔（秒）
-        self.batch_size = 96  # 一次获取的数据量
+        settings = self.db.settings  # 配置的内存副本，按类型解析
+        self.check_interval = settings.get("check_interval")  # 检测间隔（秒）
+        self.main_interval = settings.get("main_interval")  # 获取列表间隔（秒）
+        self.streamer_interval = settings.get("streamer_interval")  # 主播间检测间隔（秒）
+        self.batch_size = 96  # 一次获取的数据量（根据请求耗时自动调整）
+        self.page_size_min = settings.get("page_size_min")
+        self.page_size_max = settings.get("page_size_max")
+        self.page_samples = deque(maxlen=60)  # (条目数, 耗时, 字节数)
+        self.page_size_model = None
+        self.page_concurrency = max(1, settings.get("page_concurrency"))  # 分页并发上限
+        self.full_sweep_every = max(1, settings.get("full_sweep_every"))  # 每隔几轮全量获取一次列表
+        self._refreshes_since_full_sweep = 0
+        
+        # 对冲请求（降低慢页面导致的长尾延迟）
+        self.hedge_enabled = settings.get("hedge_enabled")
+        self.hedge_max_fraction = settings.get("hedge_max_fraction")
+        self.hedge_stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0}
+        self.hedge_window = deque(maxlen=100)  # 最近请求是否发出了对冲请求，用于限制对冲比例
+        
+        # 请求重试与熔断
+        self.retry_policy = RetryPolicy(max_attempts=settings.get("retry_attempts"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.get("breaker_threshold"),
+            reset_timeout=settings.get("breaker_reset_timeout"),
+            clock=clock
+        )
+        self._consecutive_refresh_failures = 0
+        
+        # 刷新策略规划：全量列表扫描 或 逐个主播探测
+        self.latency_estimates = {'page': None, 'probe': None}  # 各接口请求耗时的滑动平均（秒）
+        self.last_plan = None
         self.cached_data = {}
+        self.live_index = {}  # userId -> 缓存数据中的主播条目
+        self.snapshot_generation = 0  # 缓存数据版本号，每次更新数据后递增
+        self.checked_generation = None  # 上次检查时处理的缓存数据版本号
+        
+        # 调度器状态
+        self.scheduler = DeadlineScheduler(clock)
+        self.is_idle = False  # 没有监控主播时进入空闲模式
+        self._last_update_started = None
+        self._last_check_time = None
+        self._update_cycle_count = 0
+        self._check_cycle_count = 0
+        self._loop = None  # 监控线程的事件循环
+        self._current_job = None  # 正在执行的调度任务，停止监控时取消
         self.status_callbacks = []  # 状态回调函数列表
         
+        # API地址（可指向本地模拟服务器做压力测试）
+        self.api_base_url = settings.get("api_base_url").rstrip('/') or DEFAULT_API_BASE_URL
+        
+        # Cookie池：cookie为首选账号，cookie_pool中每行一个备用账号，请求在可用账号之间轮换
+        self.cookie_pool = CookiePool(parse_cookie_list(
+            f"{settings.get('cookie')}\n{settings.get('cookie_pool')}"
+        ), clock=clock)
+        
         # 代理设置
-        self.proxy_enabled = self.db.get_config("proxy_enabled", "false").lower() == "true"
-        self.proxy_url = self.db.get_config("proxy_url", "")
+        self.proxy_enabled = settings.get("proxy_enabled")
+        self.proxy_url = settings.get("proxy_url")
+        # 代理池：proxy_url为首选代理，proxy_pool中为其它备用出口
+        self.proxy_pool = ProxyPool(self._get_proxy_urls(self.proxy_url, settings.get("proxy_pool")), clock=clock)
+        
+        # HTTP客户端（持久连接池，所有请求共用）
+        self.http = http_client or HttpClient(pool_size=max(10, self.page_concurrency))
+        
+        # 请求限流使用HTTP客户端的限流器（默认为进程内共享的限流器，后台刷新与界面查询共用，界面查询优先）
+        # 注入的HTTP客户端（回放、基准测试）自带限流设置，配置项不修改它
+        self._configure_limiter = http_client is None
+        self.rate_limit_rps = settings.get("rate_limit_rps")
+        self.rate_limit_burst = settings.get("rate_limit_burst")
+        self._apply_rate_limit()
+        
+        # 主播状态变化先在内存中合并（mid -> {字段: 值}），每轮检测结束后在数据库线程中一个事务提交
+        self._pending_updates: Dict[str, Dict[str, str]] = {}
+        
+        # 调优参数在配置变化时立即生效，无需重启监控
+        settings.subscribe(self._on_tuning_config_changed, TUNING_CONFIG_KEYS)
         
         # 配置logger
         self._setup_logger()
@@ -39,18 +126,18 @@ class PandaLiveMonitor:
         self.logger = logging.getLogger('PandaLiveMonitor')
         self.logger.setLevel(logging.INFO)
         
-        # 避免重复添加handler
+        # 获取可执行文件所在目录
+        if getattr(sys, 'frozen', False):
+            # PyInstaller打包后的路径
+            app_dir = os.path.dirname(sys.executable)
+        else:
+            # 开发环境路径
+            app_dir = os.path.dirname(__file__)
+        log_file = os.path.join(app_dir, 'log.txt')
+        
+        # 避免重复添加handler（同一进程中创建多个监控实例时共用已有的handler）
         if not self.logger.handlers:
-            # 获取可执行文件所在目录
-            if getattr(sys, 'frozen', False):
-                # PyInstaller打包后的路径
-                app_dir = os.path.dirname(sys.executable)
-            else:
-                # 开发环境路径
-                app_dir = os.path.dirname(__file__)
-            
             # 创建文件handler
-            log_file = os.path.join(app_dir, 'log.txt')
             file_handler = logging.FileHandler(log_file, encoding='utf-8')
             file_handler.setLevel(logging.INFO)
             
@@ -75,16 +162,26 @@ class PandaLiveMonitor:
         self.logger.info(f"PandaLiveMonitor logger 初始化完成，日志文件: {log_file}")
         
     def set_cookie(self, cookie: str):
-        """设置Cookie"""
-        self.cookie = cookie
-        self.db.set_config("cookie", cookie)
+        """设置Cookie（每行一个，第一个为首选账号，其余加入Cookie池）"""
+        cookies = parse_cookie_list(cookie)
+        self.cookie = cookies[0] if cookies else cookie.strip()
+        self.db.set_config("cookie", self.cookie)
+        self.db.set_config("cookie_pool", "\n".join(cookies[1:]))
+        self.cookie_pool.set_cookies(cookies)
+        if len(cookies) > 1:
+            self._notify_status_change(f"[COOKIE] 已设置{len(cookies)}个Cookie，请求将在账号之间轮换")
     
     def get_cookie(self) -> str:
         """获取Cookie"""
         if not self.cookie:
-            self.cookie = self.db.get_config("cookie", "")
+            self.cookie = self.db.settings.get("cookie")
         return self.cookie
     
+    def has_valid_cookie(self) -> bool:
+        """是否已设置有效的Cookie"""
+        cookie = self.get_cookie()
+        return bool(cookie) and cookie != "Your Cookie"
+    
     def set_intervals(self, check_interval: int = 2, main_interval: int = 60, streamer_interval: int = 5):
         """设置监控间隔"""
         self.check_interval = max(1, check_interval)
@@ -93,36 +190,108 @@ class PandaLiveMonitor:
         self.db.set_config("check_interval", str(self.check_interval))
         self.db.set_config("main_interval", str(self.main_interval))
         self.db.set_config("streamer_interval", str(self.streamer_interval))
+        
+        # 监控运行中则按新的间隔重新安排下一次更新
+        if self.is_running and self._last_update_started is not None:
+            next_deadline = self._last_update_started + self.main_interval
+            self.scheduler.schedule('update', max(next_deadline, self.scheduler.clock()))
+    
+    def set_api_base_url(self, base_url: str):
+        """设置API地址（空字符串恢复默认地址）"""
+        self.api_base_url = base_url.strip().rstrip('/') or DEFAULT_API_BASE_URL
+        self.db.set_config("api_base_url", self.api_base_url)
+        self._notify_status_change(f"[SETTINGS] API地址已更新: {self.api_base_url}")
     
-    def set_proxy(self, enabled: bool, proxy_url: str = ""):
-        """设置代理"""
+    def _apply_rate_limit(self):
+        """把限流配置应用到HTTP客户端的限流器（每秒请求数和突发数，rate <= 0 表示不限流）"""
+        if self._configure_limiter:
+            self.http.limiter.configure(self.rate_limit_rps, max(1, self.rate_limit_burst))
+    
+    def _on_tuning_config_changed(self, key: str, value):
+        """调优配置变化时更新对应的参数"""
+        if key == 'page_concurrency':
+            self.page_concurrency = max(1, value)
+        elif key == 'full_sweep_every':
+            self.full_sweep_every = max(1, value)
+        elif key in ('page_size_min', 'page_size_max'):
+            setattr(self, key, value)
+            self.batch_size = min(max(self.batch_size, self.page_size_min), self.page_size_max)
+        elif key == 'hedge_enabled':
+            self.hedge_enabled = value
+        elif key == 'hedge_max_fraction':
+            self.hedge_max_fraction = value
+        elif key == 'retry_attempts':
+            self.retry_policy.max_attempts = max(1, value)
+        elif key in ('rate_limit_rps', 'rate_limit_burst'):
+            if key == 'rate_limit_rps':
+                self.rate_limit_rps = value
+            else:
+                self.rate_limit_burst = max(1, value)
+            self._apply_rate_limit()
+        self._notify_status_change(f"[SETTINGS] 配置 {key} 已更新为 {value}")
+    
+    @staticmethod
+    def _get_proxy_urls(proxy_url: str, proxy_pool: str) -> List[str]:
+        """合并首选代理和备用代理列表"""
+        return parse_proxy_list(f"{proxy_url},{proxy_pool}")
+    
+    def set_proxy(self, enabled: bool, proxy_url: str = "", proxy_pool: Optional[List[str]] = None):
+        """设置代理（proxy_pool为备用代理列表，None表示保持不变）"""
         old_enabled = self.proxy_enabled
-        old_url = self.proxy_url
+        old_urls = self.proxy_pool.get_urls()
         
         self.proxy_enabled = enabled
         self.proxy_url = proxy_url.strip()
         self.db.set_config("proxy_enabled", "true" if enabled else "false")
         self.db.set_config("proxy_url", self.proxy_url)
+        if proxy_pool is not None:
+            primary = normalize_proxy_url(self.proxy_url)
+            backups = [url for url in parse_proxy_list(",".join(proxy_pool)) if url != primary]
+            self.db.set_config("proxy_pool", ",".join(backups))
+        self.proxy_pool.set_urls(self._get_proxy_urls(self.proxy_url, self.db.settings.get("proxy_pool")))
         
         # 记录代理设置变更
-        if old_enabled != enabled or old_url != self.proxy_url:
-            if enabled and self.proxy_url:
-                self._notify_status_change(f"[PROXY] 代理设置已更新: 启用代理 {self.proxy_url}")
+        urls = self.proxy_pool.get_urls()
+        if old_enabled != enabled or old_urls != urls:
+            if enabled and urls:
+                self._notify_status_change(f"[PROXY] 代理设置已更新: 启用代理 {', '.join(urls)}")
             else:
                 self._notify_status_change("[PROXY] 代理设置已更新: 禁用代理，使用直连")
     
-    def get_proxy_config(self) -> dict:
-        """获取代理配置"""
-        if self.proxy_enabled and self.proxy_url:
-            # 确保代理URL以http://开头
-            if not self.proxy_url.startswith(('http://', 'https://')):
-                self.proxy_url = f"http://{self.proxy_url}"
+    def get_proxy_config(self, proxy: Optional[str] = None) -> dict:
+        """获取代理配置（未指定代理时使用首选代理）"""
+        if proxy is None and self.proxy_enabled and self.proxy_url:
+            proxy = normalize_proxy_url(self.proxy_url)
+        if proxy:
             return {
-                'http': self.proxy_url,
-                'https': self.proxy_url
+                'http': proxy,
+                'https': proxy
             }
         return {}
     
+    def _acquire_proxy(self) -> Optional[str]:
+        """从代理池选择本次请求使用的代理，未启用代理时返回None"""
+        if not self.proxy_enabled:
+            return None
+        return self.proxy_pool.acquire()
+    
+    def _release_proxy(self, proxy: Optional[str], elapsed: float, error: Optional[BaseException] = None):
+        """把请求结果反馈给代理池，只有连接类错误和代理鉴权失败计为代理失败"""
+        if proxy is None:
+            return
+        if isinstance(error, asyncio.CancelledError):
+            self.proxy_pool.release(proxy, elapsed, None)
+            return
+        if isinstance(error, requests.HTTPError):
+            # API本身返回的5xx与代理无关；代理自身的网关错误发生在CONNECT阶段，会以ProxyError（连接错误）抛出
+            status_code = error.response.status_code if error.response is not None else None
+            failed = status_code == 407
+        else:
+            failed = isinstance(error, requests.ConnectionError)
+        self.proxy_pool.release(proxy, elapsed, not failed)
+        if failed and self.proxy_pool.is_ejected(proxy):
+            self._notify_status_change(f"[PROXY] 代理 {proxy} 连续失败，暂时停用")
+    
     def add_status_callback(self, callback: Callable):
         """添加状态回调函数"""
         self.status_callbacks.append(callback)
@@ -135,55 +304,92 @@ class PandaLiveMonitor:
             except Exception as e:
                 self.logger.error(f"回调函数执行失败: {e}")
     
-    async def fetch_json(self, offset: int, limit: int) -> Optional[Dict]:
-        """获取PandaLive API数据"""
+    async def fetch_json(self, offset: int, limit: int, priority: int = PRIORITY_BACKGROUND,
+                         started: Optional[asyncio.Event] = None) -> Optional[Dict]:
+        """获取PandaLive API数据（list中为LiveEntry条目）；started在请求真正发出时置位"""
+        cookie_state = None
+        cookie_outcome = None
+        proxy = None
+        error = None
+        start_time = self.clock()
+        elapsed = None
         try:
-            url = "https://api.pandalive.co.kr/v1/live"
+            url = f"{self.api_base_url}/v1/live"
             params = {
                 'offset': offset,
                 'limit': limit,
                 'orderBy': 'hot',
                 'onlyNewBj': 'N'
             }
+            cookie_state = self.cookie_pool.acquire()
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/109.0.0.0 Safari/537.36',
-                'cookie': self.get_cookie()
+                'cookie': cookie_state.cookie if cookie_state else self.get_cookie()
             }
             
             self._notify_status_change(f"[WEB] 正在请求API: offset={offset}, limit={limit}")
-            start_time = time.time()
             
-            # 获取代理配置
-            proxies = self.get_proxy_config()
+            # 从代理池选择代理
+            proxy = self._acquire_proxy()
+            proxies = self.get_proxy_config(proxy)
             if proxies:
-                self._notify_status_change(f"[PROXY] 使用代理请求API: {self.proxy_url}")
+                self._notify_status_change(f"[PROXY] 使用代理请求API: {proxy}")
             else:
                 self._notify_status_change("[PROXY] 使用直连请求API")
             
-            response = requests.get(url, params=params, headers=headers, proxies=proxies, timeout=5)
+            response, timing = await self.http.request(
+                'GET', url, priority=priority, started=started,
+                params=params, headers=headers, proxies=proxies, timeout=5
+            )
             response.raise_for_status()
+            data = response.json()
+            if not isinstance(data, dict):
+                data = None
+            elif isinstance(data.get('list'), list):
+                # 只保留需要的字段
+                data['list'] = [LiveEntry.from_api(item) for item in data['list']]
             
-            request_time = time.time() - start_time
-            self._notify_status_change(f"[OK] API请求成功: 耗时{request_time:.2f}秒, 状态码={response.status_code}")
+            elapsed = timing['elapsed']
+            self._notify_status_change(f"[OK] API请求成功: 耗时{timing['elapsed']:.2f}秒, 状态码={timing['status_code']}")
+            self._observe_latency('page', timing['elapsed'])
+            if data and isinstance(data.get('list'), list):
+                self.page_samples.append((len(data['list']), timing['elapsed'], timing['bytes']))
             
-            data = response.json()
             if data and data.get('result'):
                 list_count = len(data.get('list', []))
                 self._notify_status_change(f"[LIST] 解析数据成功: 获取到{list_count}个主播信息")
+                # 第一页为空通常说明Cookie已失效
+                cookie_outcome = OUTCOME_EMPTY if offset == 0 and not list_count else OUTCOME_OK
             else:
                 self._notify_status_change("[WARNING] API返回数据为空或格式异常")
+                cookie_outcome = OUTCOME_EMPTY
             
             return data
+        except asyncio.CancelledError as e:
+            error = e
+            raise
         except Exception as e:
+            error = e
+            # 只有鉴权和限流类错误计入Cookie失败，网络错误与账号无关
+            if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code in (401, 403, 429):
+                cookie_outcome = OUTCOME_ERROR
             error_msg = f"获取API数据失败: {e}"
             self.logger.error(error_msg)
             self._notify_status_change(f"[ERROR] {error_msg}")
             return None
+        finally:
+            self._release_proxy(proxy, elapsed if elapsed is not None else self.clock() - start_time, error)
+            if self.cookie_pool.release(cookie_state, cookie_outcome):
+                self._notify_status_change(f"[COOKIE] Cookie {cookie_state.label} 连续出错或返回空数据，暂时隔离")
     
-    async def fetch_streamer_info(self, mid: str) -> Optional[Dict]:
+    async def fetch_streamer_info(self, mid: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[Dict]:
         """获取单个主播信息"""
+        proxy = None
+        error = None
+        start_time = self.clock()
+        elapsed = None
         try:
-            url = "https://api.pandalive.co.kr/v1/member/bj"
+            url = f"{self.api_base_url}/v1/member/bj"
             data = {
                 'userId': mid,
                 'info': 'media'
@@ -194,20 +400,21 @@ class PandaLiveMonitor:
             }
             
             self._notify_status_change(f"[SEARCH] 正在获取主播 {mid} 的详细信息")
-            start_time = time.time()
             
-            # 获取代理配置
-            proxies = self.get_proxy_config()
+            # 从代理池选择代理
+            proxy = self._acquire_proxy()
+            proxies = self.get_proxy_config(proxy)
             if proxies:
-                self._notify_status_change(f"[PROXY] 使用代理请求主播信息: {self.proxy_url}")
+                self._notify_status_change(f"[PROXY] 使用代理请求主播信息: {proxy}")
             else:
                 self._notify_status_change("[PROXY] 使用直连请求主播信息")
             
-            response = requests.post(url, data=data, headers=headers, proxies=proxies, timeout=5)
+            response, timing = await self.http.request('POST', url, priority=priority, data=data, headers=headers, proxies=proxies, timeout=5)
+            elapsed = timing['elapsed']
             response.raise_for_status()
             
-            request_time = time.time() - start_time
-            self._notify_status_change(f"[OK] 主播信息请求成功: {mid}, 耗时{request_time:.2f}秒")
+            self._notify_status_change(f"[OK] 主播信息请求成功: {mid}, 耗时{timing['elapsed']:.2f}秒")
+            self._observe_latency('probe', timing['elapsed'])
             
             result = response.json()
             if result and result.get('result'):
@@ -216,182 +423,607 @@ class PandaLiveMonitor:
                 self._notify_status_change(f"[WARNING] 主播 {mid} 信息为空或格式异常")
             
             return result
+        except asyncio.CancelledError as e:
+            error = e
+            raise
         except Exception as e:
+            error = e
             error_msg = f"获取主播信息失败 {mid}: {e}"
             self.logger.error(error_msg)
             self._notify_status_change(f"[ERROR] {error_msg}")
             return None
+        finally:
+            self._release_proxy(proxy, elapsed if elapsed is not None else self.clock() - start_time, error)
     
-    async def update_all_streamers_data(self):
-        """更新所有在线主播数据"""
+    async def update_all_streamers_data(self, full_sweep: Optional[bool] = None):
+        """更新所有在线主播数据；非全量模式下找到所有监控主播后提前结束分页"""
         try:
-            cookie = self.get_cookie()
-            if not cookie or cookie == "Your Cookie":
+            if not self.has_valid_cookie():
                 self._notify_status_change("[WARNING] 请设置有效的Cookie")
                 return
             
-            self._notify_status_change("🔄 开始更新所有主播数据...")
-            start_time = time.time()
+            # 决定本轮是否全量获取
+            if full_sweep is None:
+                full_sweep = self._is_full_sweep_due()
+            missing_mids = None
+            watched_mids = None
+            if not full_sweep:
+                missing_mids = {vtb.mid for vtb in self.db.get_all_watched_vtbs()}
+                watched_mids = set(missing_mids)
+            
+            mode = "全量" if full_sweep else f"提前结束 (监控{len(missing_mids)}个主播)"
+            self._notify_status_change(f"🔄 开始更新所有主播数据... 模式: {mode}")
+            start_time = self.clock()
+            
+            # 本轮刷新固定使用开始时的分页大小（配置变化可能在刷新过程中修改self.batch_size）
+            batch_size = self.batch_size
             
             # 获取第一页数据
-            json_data = await self.fetch_json(0, self.batch_size)
+            json_data = await self._fetch_with_retry(self._fetch_page, 0, batch_size, description="第1页")
             if not json_data or not json_data.get('result'):
                 self._notify_status_change("[ERROR] 获取列表失败")
                 return
             
             total = json_data.get('page', {}).get('total', 0)
-            first_page_count = len(json_data.get('list', []))
+            entries = list(json_data.get('list') or [])
+            first_page_count = len(entries)
             self._notify_status_change(f"[STATS] 在线主播总数: {total} | 第一页获取: {first_page_count}个主播")
+            if missing_mids is not None:
+                missing_mids.difference_update(entry.user_id for entry in entries)
+            
+            # 服务器限制了每页数量时，按实际返回的数量分页，避免页面之间出现空隙
+            if self._is_short_page(0, batch_size, json_data) and first_page_count:
+                batch_size = first_page_count
             
-            # 如果在线主播数超过batch_size，获取更多页面
-            if total > self.batch_size:
-                remaining = total - self.batch_size
-                page = 2
-                total_pages = (total + self.batch_size - 1) // self.batch_size
-                self._notify_status_change(f"📄 需要获取 {total_pages} 页数据，开始获取剩余页面...")
+            # 如果在线主播数超过batch_size，并发获取剩余页面
+            failed_pages = []
+            skipped_pages = 0
+            if total > batch_size:
+                offsets = list(range(batch_size, total, batch_size))
+                total_pages = len(offsets) + 1
                 
-                while remaining > 0:
-                    self._notify_status_change(f"📄 正在获取第{page}页 (剩余{remaining}个主播)")
-                    offset = (page - 1) * self.batch_size
-                    limit = min(self.batch_size, remaining)
-                    
-                    json2 = await self.fetch_json(offset, limit)
-                    if json2 and json2.get('list'):
-                        # 合并数据，避免重复
-                        existing_codes = {item.get('code') for item in json_data.get('list', [])}
-                        new_items = [item for item in json2.get('list', []) 
-                                   if item.get('code') not in existing_codes]
-                        json_data['list'].extend(new_items)
-                        self._notify_status_change(f"[OK] 第{page}页合并成功: 新增{len(new_items)}个主播")
-                        remaining -= self.batch_size
-                        page += 1
-                    else:
-                        self._notify_status_change(f"[WARNING] 第{page}页获取失败，停止获取")
+                # 提前结束模式下按批获取，每批后检查是否已找到所有监控主播
+                wave_size = len(offsets) if missing_mids is None else self.page_concurrency
+                existing_codes = {entry.code for entry in entries}
+                self._notify_status_change(f"📄 需要获取 {total_pages} 页数据，开始并发获取剩余页面 (并发上限: {self.page_concurrency})...")
+                
+                for wave_start in range(0, len(offsets), wave_size):
+                    if missing_mids is not None and not missing_mids:
+                        skipped_pages = len(offsets) - wave_start
                         break
+                    
+                    wave = offsets[wave_start:wave_start + wave_size]
+                    pages = await self._fetch_pages(wave, total, batch_size)
+                    
+                    # 按offset顺序合并数据，避免重复
+                    for page, (offset, json2) in enumerate(zip(wave, pages), wave_start + 2):
+                        if json2 and self._is_short_page(offset, min(batch_size, total - offset), json2):
+                            # 之后的页面已按原分页大小请求，本页未返回的部分无法补齐，按数据不完整处理
+                            failed_pages.append(page)
+                            self._notify_status_change(f"[WARNING] 第{page}页返回数量不足 (offset={offset})，数据不完整")
+                        if json2 and json2.get('list'):
+                            new_entries = [entry for entry in json2.get('list', [])
+                                           if entry.code not in existing_codes]
+                            existing_codes.update(entry.code for entry in new_entries)
+                            entries.extend(new_entries)
+                            if missing_mids is not None:
+                                missing_mids.difference_update(entry.user_id for entry in new_entries)
+                            self._notify_status_change(f"[OK] 第{page}页合并成功: 新增{len(new_entries)}个主播")
+                        elif page not in failed_pages:
+                            failed_pages.append(page)
+                            self._notify_status_change(f"[WARNING] 第{page}页获取失败 (offset={offset})")
+            
+            if skipped_pages:
+                self._notify_status_change(f"[STATS] 已找到全部监控主播，提前结束分页，跳过{skipped_pages}页")
+            
+            # 标记是否为不完整的数据
+            if failed_pages:
+                self._notify_status_change(f"[WARNING] 数据不完整: {len(failed_pages)}页获取失败 (第{', '.join(map(str, failed_pages))}页)")
+            
+            # 保存数据到缓存，并建立userId索引
+            # 提前结束分页时，数据只覆盖本轮开始时的监控主播，之后添加的主播不能据此判断状态
+            covered_mids = watched_mids if skipped_pages else None
+            self._store_snapshot(entries, total, failed_pages=failed_pages, covered_mids=covered_mids,
+                                 full_sweep=full_sweep, skipped_pages=skipped_pages)
+            if full_sweep and not failed_pages:
+                self._refreshes_since_full_sweep = 0
+            else:
+                self._refreshes_since_full_sweep += 1
+            if not failed_pages:
+                self._tune_page_size(total)
             
-            # 保存数据到缓存
-            self.cached_data = json_data
-            total_time = time.time() - start_time
-            final_count = len(json_data.get('list', []))
-            self._notify_status_change(f"[OK] 数据更新完成: 总计{final_count}个主播, 耗时{total_time:.2f}秒")
+            total_time = self.clock() - start_time
+            final_count = len(entries)
+            if failed_pages:
+                self._notify_status_change(f"[WARNING] 数据部分更新完成: 获取{final_count}/{total}个主播, 耗时{total_time:.2f}秒")
+            else:
+                self._notify_status_change(f"[OK] 数据更新完成: 总计{final_count}个主播, 耗时{total_time:.2f}秒")
             
         except Exception as e:
             error_msg = f"更新数据失败: {str(e)}"
             self.logger.error(error_msg)
             self._notify_status_change(f"[ERROR] {error_msg}")
     
-    async def check_watched_streamers(self):
-        """检查监控的主播状态"""
+    def _is_short_page(self, offset: int, limit: int, json_data: Dict) -> bool:
+        """检查非最后一页返回的数量是否少于请求的数量（服务器限制了每页数量），是则按实际数量降低分页上限"""
+        count = len(json_data.get('list') or [])
+        page_total = json_data.get('page', {}).get('total', 0)
+        if count >= limit or offset + count >= page_total:
+            return False
+        if count and count < self.page_size_max:
+            self._notify_status_change(f"[TUNE] 服务器每页最多返回{count}条，分页上限调整: {self.page_size_max} -> {count}")
+            self.page_size_max = count
+            self.page_size_min = min(self.page_size_min, count)
+            self.batch_size = min(self.batch_size, count)
+        return True
+    
+    def _estimate_refresh_time(self, page_size: int, total: int, overhead: float, per_item: float) -> float:
+        """估算指定分页大小下全量刷新的耗时"""
+        pages = max(1, (total + page_size - 1) // page_size)
+        # 第一页单独获取，其余页面按并发上限分批
+        waves = 1 + (pages - 1 + self.page_concurrency - 1) // self.page_concurrency
+        estimate = waves * (overhead + per_item * min(page_size, max(total, 1)))
+        # 请求数超过限流突发数时，还受限流速率约束
+        limiter = self.http.limiter
+        if limiter.rate > 0:
+            estimate = max(estimate, (pages - limiter.burst) / limiter.rate)
+        return estimate
+    
+    def _tune_page_size(self, total: int):
+        """根据每页耗时拟合 耗时 = 固定开销 + 单条耗时 × 条目数，选择刷新总耗时最短的分页大小"""
+        samples = list(self.page_samples)
+        if len(samples) < 5 or not total:
+            return
+        
+        count = len(samples)
+        mean_x = sum(sample[0] for sample in samples) / count
+        mean_y = sum(sample[1] for sample in samples) / count
+        var_x = sum((sample[0] - mean_x) ** 2 for sample in samples)
+        if var_x == 0:
+            # 样本的条目数都相同，无法区分固定开销和单条耗时，先换一个分页大小采样
+            step = 24 if self.batch_size + 24 <= self.page_size_max else -24
+            self.batch_size = max(self.page_size_min, min(self.page_size_max, self.batch_size + step))
+            return
+        
+        per_item = max(0.0, sum((sample[0] - mean_x) * (sample[1] - mean_y) for sample in samples) / var_x)
+        overhead = max(0.0, mean_y - per_item * mean_x)
+        bytes_per_item = sum(sample[2] for sample in samples) / max(1, sum(sample[0] for sample in samples))
+        
+        # 每次最多调整1.5倍，避免少量样本的噪声导致分页大小大幅跳动
+        candidates = [size for size in range(self.page_size_min, self.page_size_max + 1, 12)
+                      if self.batch_size / 1.5 <= size <= self.batch_size * 1.5] or [self.batch_size]
+        # 预估耗时相同时选较大的分页，减少请求数
+        best = min(candidates, key=lambda size: (self._estimate_refresh_time(size, total, overhead, per_item), -size))
+        self.page_size_model = {
+            'overhead': overhead,
+            'per_item': per_item,
+            'bytes_per_item': bytes_per_item,
+            'samples': count,
+            'estimated_refresh_time': self._estimate_refresh_time(best, total, overhead, per_item)
+        }
+        if best != self.batch_size:
+            self._notify_status_change(
+                f"[TUNE] 分页大小调整: {self.batch_size} -> {best} "
+                f"(固定开销{overhead:.3f}秒, 单条{per_item * 1000:.2f}毫秒, 预估刷新{self.page_size_model['estimated_refresh_time']:.2f}秒)"
+            )
+            self.batch_size = best
+    
+    def _store_snapshot(self, entries: List[LiveEntry], total: int, failed_pages: Optional[List[int]] = None,
+                        failed_mids: Optional[List[str]] = None, covered_mids: Optional[Set[str]] = None, **extra):
+        """保存新的缓存数据并递增版本号；covered_mids为数据覆盖的主播（None表示覆盖全部在线主播）"""
+        failed_pages = failed_pages or []
+        failed_mids = failed_mids or []
+        self.snapshot_generation += 1
+        self.live_index = self._build_live_index(entries)
+        self.cached_data = {
+            'list': entries,
+            'total': total,
+            'partial': bool(failed_pages or failed_mids),
+            'failed_pages': failed_pages,
+            'failed_mids': failed_mids,
+            'covered_mids': covered_mids,
+            'generation': self.snapshot_generation,
+            **extra
+        }
+    
+    def _observe_latency(self, kind: str, elapsed: float):
+        """更新某类请求耗时的滑动平均"""
+        previous = self.latency_estimates.get(kind)
+        self.latency_estimates[kind] = elapsed if previous is None else previous * 0.8 + elapsed * 0.2
+    
+    def _is_full_sweep_due(self) -> bool:
+        """是否需要全量刷新：定期全量刷新，上次数据不完整时也全量刷新"""
+        return (self._refreshes_since_full_sweep + 1 >= self.full_sweep_every or
+                not self.cached_data or bool(self.cached_data.get('partial')))
+    
+    def _plan_refresh(self, watched_count: int) -> Dict:
+        """估算两种刷新策略的开销（请求次数 × 平均耗时），选择开销较小的一种"""
+        page_latency = self.latency_estimates['page'] or 0.5
+        probe_latency = self.latency_estimates['probe'] or page_latency
+        total = self.cached_data.get('total', 0) if self.cached_data else 0
+        
+        scan_requests = max(1, (total + self.batch_size - 1) // self.batch_size)
+        probe_requests = watched_count
+        plan = {
+            'scan_requests': scan_requests,
+            'scan_cost': scan_requests * page_latency,
+            'probe_requests': probe_requests,
+            'probe_cost': probe_requests * probe_latency,
+            # 逐个探测需要按主播间间隔执行，必须能在一个更新周期内完成
+            'probe_wall_time': probe_requests * probe_latency + max(0, probe_requests - 1) * self.streamer_interval
+        }
+        
+        if not total or self._is_full_sweep_due():
+            plan['plan'] = 'scan'
+            plan['reason'] = '需要全量刷新'
+        elif plan['probe_wall_time'] >= self.main_interval:
+            plan['plan'] = 'scan'
+            plan['reason'] = '逐个探测无法在更新间隔内完成'
+        elif plan['probe_cost'] < plan['scan_cost']:
+            plan['plan'] = 'probe'
+            plan['reason'] = '逐个探测开销更低'
+        else:
+            plan['plan'] = 'scan'
+            plan['reason'] = '全量扫描开销更低'
+        plan['estimated_cost'] = plan['scan_cost'] if plan['plan'] == 'scan' else plan['probe_cost']
+        plan['estimated_requests'] = scan_requests if plan['plan'] == 'scan' else probe_requests
+        return plan
+    
+    async def refresh_snapshot(self, watched_vtbs: List[VtbRecord]):
+        """按规划选择全量扫描或逐个探测来刷新缓存数据，并记录预估与实际开销"""
+        plan = self._plan_refresh(len(watched_vtbs))
+        plan_name = "全量扫描" if plan['plan'] == 'scan' else "逐个探测"
+        self._notify_status_change(
+            f"[PLAN] 刷新策略: {plan_name} ({plan['reason']}) | "
+            f"扫描预估{plan['scan_requests']}次请求/{plan['scan_cost']:.2f}秒, "
+            f"探测预估{plan['probe_requests']}次请求/{plan['probe_cost']:.2f}秒"
+        )
+        
+        stats_before = self.http.get_stats()
+        start_time = self.clock()
+        if plan['plan'] == 'probe':
+            await self.probe_watched_streamers(watched_vtbs)
+        else:
+            await self.update_all_streamers_data()
+        stats_after = self.http.get_stats()
+        
+        plan['actual_requests'] = stats_after['total_requests'] - stats_before['total_requests']
+        plan['actual_cost'] = stats_after['busy_time'] - stats_before['busy_time']
+        plan['wall_time'] = self.clock() - start_time
+        self.last_plan = plan
+        self._notify_status_change(
+            f"[PLAN] {plan_name}完成: 预估{plan['estimated_requests']}次请求/{plan['estimated_cost']:.2f}秒, "
+            f"实际{plan['actual_requests']}次请求/{plan['actual_cost']:.2f}秒, 总耗时{plan['wall_time']:.2f}秒"
+        )
+        self.logger.info(
+            f"刷新策略={plan['plan']}, 预估开销={plan['estimated_cost']:.2f}秒, "
+            f"实际开销={plan['actual_cost']:.2f}秒, 总耗时={plan['wall_time']:.2f}秒"
+        )
+    
+    async def probe_watched_streamers(self, watched_vtbs: List[VtbRecord]):
+        """逐个请求监控主播的信息来刷新缓存数据（主播之间按主播间间隔等待）"""
+        self._notify_status_change(f"[SEARCH] 开始逐个探测 {len(watched_vtbs)} 个监控主播...")
+        entries = []
+        failed_mids = []
+        probed_mids = set()
+        
+        for i, vtb in enumerate(watched_vtbs, 1):
+            probed_mids.add(vtb.mid)
+            streamer_info = await self._fetch_with_retry(
+                self.fetch_streamer_info, vtb.mid, description=f"主播{vtb.mid}", priority=PRIORITY_PROBE
+            )
+            if not streamer_info or not streamer_info.get('result'):
+                failed_mids.append(vtb.mid)
+            else:
+                media_data = streamer_info.get('media') or {}
+                if media_data.get('startTime'):
+                    entries.append(LiveEntry.from_api({**media_data, 'userId': vtb.mid}))
+            
+            # 实际发出网络请求时才需要主播间间隔
+            if i < len(watched_vtbs):
+                if not self.is_running:
+                    break
+                await asyncio.sleep(self.streamer_interval)
+        
+        if failed_mids:
+            self._notify_status_change(f"[WARNING] 数据不完整: {len(failed_mids)}个主播探测失败")
+        
+        total = self.cached_data.get('total', 0) if self.cached_data else 0
+        # 探测结果只覆盖探测过的主播
+        self._store_snapshot(entries, total, failed_mids=failed_mids, covered_mids=probed_mids,
+                             full_sweep=False, probed=True)
+        self._refreshes_since_full_sweep += 1
+        self._notify_status_change(f"[OK] 逐个探测完成: 在线{len(entries)}个主播")
+    
+    def _build_live_index(self, entries: List[LiveEntry]) -> Dict[str, LiveEntry]:
+        """根据列表数据建立userId索引"""
+        index = {}
+        for entry in entries:
+            if entry.user_id and entry.user_id not in index:
+                index[entry.user_id] = entry
+        return index
+    
+    def get_live_entry(self, mid: str) -> Optional[LiveEntry]:
+        """从当前缓存数据中查找在线主播条目"""
+        return self.live_index.get(mid)
+    
+    async def _fetch_with_retry(self, fetch: Callable, *args, description: str = "", **kwargs) -> Optional[Dict]:
+        """带指数退避重试和熔断保护的请求，请求失败时返回None"""
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            token = self.breaker.allow_request()
+            if token is None:
+                self._notify_status_change(f"[BREAKER] 熔断中，跳过请求: {description} ({self.breaker.get_remaining_open_time():.1f}秒后探测恢复)")
+                return None
+            
+            try:
+                result = await fetch(*args, **kwargs)
+            except asyncio.CancelledError:
+                self.breaker.release(token)
+                raise
+            if result is not None:
+                if self.breaker.record_success(token):
+                    self._notify_status_change("[BREAKER] 探测请求成功，熔断已恢复")
+                return result
+            
+            if self.breaker.record_failure(token):
+                self._notify_status_change(f"[BREAKER] 连续失败{self.breaker.consecutive_failures}次，熔断打开，{self.breaker.reset_timeout:.0f}秒后探测恢复")
+                self.logger.warning(f"熔断打开: 连续失败{self.breaker.consecutive_failures}次")
+                return None
+            
+            if attempt < self.retry_policy.max_attempts:
+                delay = self.retry_policy.get_delay(attempt)
+                self._notify_status_change(f"[RETRY] {description} 第{attempt}次请求失败，{delay:.2f}秒后重试")
+                await asyncio.sleep(delay)
+        
+        return None
+    
+    async def _fetch_page(self, offset: int, limit: int) -> Optional[Dict]:
+        """获取一页列表数据；启用对冲请求时，请求发出后超过自适应阈值仍未返回则再发一个相同请求，取先返回的结果"""
+        self.hedge_stats['requests'] += 1
+        threshold = self._get_hedge_threshold()
+        if threshold is None:
+            self.hedge_window.append(False)
+            return await self.fetch_json(offset, limit)
+        
+        started = asyncio.Event()
+        primary = asyncio.ensure_future(self.fetch_json(offset, limit, started=started))
+        tasks = [primary]
+        try:
+            # 在限流器中排队的时间不算慢，从取得令牌、请求发出时开始计时
+            waiter = asyncio.ensure_future(started.wait())
+            tasks.append(waiter)
+            await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+            
+            # 对冲请求数量不能超过最近请求数的一定比例，避免成倍增加API负载
+            hedged = sum(self.hedge_window)
+            if done or hedged + 1 > self.hedge_max_fraction * (len(self.hedge_window) + 1):
+                self.hedge_window.append(False)
+                return await primary
+            
+            self.hedge_window.append(True)
+            self.hedge_stats['hedged'] += 1
+            self._notify_status_change(f"[HEDGE] offset={offset} 超过{threshold:.2f}秒未返回，发出对冲请求")
+            hedge = asyncio.ensure_future(self.fetch_json(offset, limit))
+            tasks.append(hedge)
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.result() is not None:
+                        if task is hedge:
+                            self.hedge_stats['hedge_wins'] += 1
+                        return task.result()
+            return None
+        finally:
+            # 取消仍未返回的请求（包括任务被取消时）
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def _get_hedge_threshold(self) -> Optional[float]:
+        """对冲阈值：最近请求耗时的p90，未启用或样本不足时返回None"""
+        if not self.hedge_enabled or len(self.http.latencies) < 20:
+            return None
+        return self.http.get_latency_percentile(90)
+    
+    async def _fetch_pages(self, offsets: List[int], total: int, batch_size: int) -> List[Optional[Dict]]:
+        """并发获取多个页面（每页batch_size条），结果顺序与offsets一致"""
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+        
+        async def fetch_page(offset: int) -> Optional[Dict]:
+            async with semaphore:
+                return await self._fetch_with_retry(
+                    self._fetch_page, offset, min(batch_size, total - offset),
+                    description=f"第{offset // batch_size + 1}页"
+                )
+        
+        return await asyncio.gather(*(fetch_page(offset) for offset in offsets))
+    
+    def has_pending_check(self) -> bool:
+        """缓存数据是否有尚未检查的新版本"""
+        return self.snapshot_generation != self.checked_generation
+    
+    def request_check(self):
+        """要求重新处理当前缓存数据（如监控列表发生变化），监控运行时按检测间隔尽快执行"""
+        self.checked_generation = None
+        if self.is_running:
+            earliest = self.scheduler.clock()
+            if self._last_check_time is not None:
+                earliest = max(earliest, self._last_check_time + self.check_interval)
+            self.scheduler.schedule('check', earliest)
+    
+    async def check_watched_streamers(self, force: bool = False) -> bool:
+        """检查监控的主播状态，缓存数据未变化时直接跳过，返回是否进行了检查"""
+        generation = self.snapshot_generation
+        if not force and generation == self.checked_generation:
+            return False
+        
         watched_vtbs = self.db.get_all_watched_vtbs()
         if not watched_vtbs:
             self._notify_status_change("[LIST] 没有需要监控的主播")
-            return
+            self.checked_generation = generation
+            return True
         
-        if not self.cached_data or not self.cached_data.get('list'):
+        # 定向探测的结果为空说明监控的主播都不在线，是有效数据；全量扫描为空则通常是请求异常
+        if not self.cached_data or (not self.cached_data.get('list') and not self.cached_data.get('probed')):
             self._notify_status_change("[WARNING] 缓存数据为空，跳过主播状态检查")
-            return
+            self.checked_generation = generation
+            return True
         
-        self._notify_status_change(f"[SEARCH] 开始检查 {len(watched_vtbs)} 个监控主播的状态...")
-        start_time = time.time()
-        online_count = 0
-        offline_count = 0
+        self._notify_status_change(f"[SEARCH] 开始检查 {len(watched_vtbs)} 个监控主播的状态 (数据版本: {generation})...")
+        start_time = self.clock()
         
-        # 处理每个监控的主播
-        for i, vtb in enumerate(watched_vtbs, 1):
+        # 一次性对比缓存数据与上次状态，只处理发生变化的主播
+        transitions = self._detect_transitions(watched_vtbs)
+        
+        for vtb, streamer_data in transitions['online'] + transitions['changed']:
             try:
-                self._notify_status_change(f"[SEARCH] [{i}/{len(watched_vtbs)}] 检查主播: {vtb['mid']}")
-                
-                # 在缓存数据中查找该主播
-                streamer_data = None
-                for item in self.cached_data.get('list', []):
-                    if item.get('userId') == vtb['mid']:
-                        streamer_data = item
-                        break
-                
-                if streamer_data:
-                    # 主播在线
-                    await self._process_online_streamer(vtb, streamer_data)
-                    online_count += 1
-                    self._notify_status_change(f"[ONLINE] [{i}/{len(watched_vtbs)}] {vtb['mid']}: 在线")
-                    self.logger.info(f"{vtb['mid']}: online")
-                else:
-                    # 主播离线
-                    await self._process_offline_streamer(vtb)
-                    offline_count += 1
-                    self._notify_status_change(f"[OFFLINE] [{i}/{len(watched_vtbs)}] {vtb['mid']}: 离线")
-                    self.logger.info(f"{vtb['mid']}: offline")
-                
-                # 检查间隔
-                if i < len(watched_vtbs):  # 不是最后一个主播
-                    self._notify_status_change(f"⏱️ 等待 {self.streamer_interval} 秒后检查下一个主播...")
-                    await asyncio.sleep(self.streamer_interval)
-                
+                await self._process_online_streamer(vtb, streamer_data)
             except Exception as e:
-                error_msg = f"检查主播 {vtb['mid']} 时出错: {e}"
+                error_msg = f"检查主播 {vtb.mid} 时出错: {e}"
                 self.logger.error(error_msg)
                 self._notify_status_change(f"[ERROR] {error_msg}")
         
-        total_time = time.time() - start_time
-        self._notify_status_change(f"[OK] 主播状态检查完成: 在线{online_count}个, 离线{offline_count}个, 耗时{total_time:.2f}秒")
+        for vtb in transitions['offline']:
+            try:
+                await self._process_offline_streamer(vtb)
+            except Exception as e:
+                error_msg = f"检查主播 {vtb.mid} 时出错: {e}"
+                self.logger.error(error_msg)
+                self._notify_status_change(f"[ERROR] {error_msg}")
+        
+        # 本轮所有变化在一个事务中提交
+        await self.flush_pending_updates()
+        
+        for vtb, _ in transitions['online']:
+            self.logger.info(f"{vtb.mid}: online")
+        for vtb in transitions['offline']:
+            self.logger.info(f"{vtb.mid}: offline")
+        
+        online_count = transitions['online_count']
+        offline_count = len(watched_vtbs) - online_count
+        total_time = self.clock() - start_time
+        self._notify_status_change(
+            f"[OK] 主播状态检查完成: 在线{online_count}个, 离线{offline_count}个 | "
+            f"开播{len(transitions['online'])}个, 下播{len(transitions['offline'])}个, "
+            f"信息变化{len(transitions['changed'])}个, 耗时{total_time:.2f}秒"
+        )
+        self.checked_generation = generation
+        return True
     
-    async def _process_online_streamer(self, vtb: Dict, streamer_data: Dict):
-        """处理在线主播"""
-        start_time = streamer_data.get('startTime', '')
-        title = streamer_data.get('title', '')
-        usernick = streamer_data.get('userNick', '')
+    def _detect_transitions(self, watched_vtbs: List[VtbRecord]) -> Dict:
+        """对比缓存数据与监控主播的上次状态，找出开播、下播和信息变化的主播"""
+        went_online = []
+        changed = []
+        went_offline = []
+        online_count = 0
+        held_count = 0
         
-        # 构建标题标识
-        live_type = "🎥" if streamer_data.get('liveType') == "rec" else ""
-        is_pw = "🔒" if streamer_data.get('isPw') else ""
-        is_adult = "🔞" if streamer_data.get('isAdult') else ""
-        fan_type = "💰" if streamer_data.get('type') == "fan" else ""
-        full_title = f"{live_type}{fan_type}{is_pw}{is_adult}{title}"
+        # 数据不完整时，缺失的主播可能只是在获取失败的页面里，不能判定为下播
+        partial = bool(self.cached_data.get('partial'))
+        failed_mids = set(self.cached_data.get('failed_mids') or [])
+        only_failed_mids_uncertain = bool(self.cached_data.get('probed'))
+        covered_mids = self.cached_data.get('covered_mids')
+        
+        for vtb in watched_vtbs:
+            streamer_data = self.get_live_entry(vtb.mid)
+            if not streamer_data and covered_mids is not None and vtb.mid not in covered_mids:
+                # 数据不包含该主播（如刷新后才添加），状态未知，保持原状态
+                if vtb.live_status:
+                    online_count += 1
+                continue
+            if streamer_data:
+                online_count += 1
+                if not vtb.live_status:
+                    went_online.append((vtb, streamer_data))
+                elif (streamer_data.start_time != vtb.live_status or
+                      streamer_data.user_nick != vtb.usernick or
+                      streamer_data.full_title != vtb.title):
+                    changed.append((vtb, streamer_data))
+            elif vtb.live_status:
+                if partial and (not only_failed_mids_uncertain or vtb.mid in failed_mids):
+                    # 保持在线状态，等待完整数据再判断
+                    held_count += 1
+                    online_count += 1
+                else:
+                    went_offline.append(vtb)
+        
+        if held_count:
+            self._notify_status_change(f"[WARNING] 数据不完整，{held_count}个在线主播暂不判定为下播")
+        
+        return {
+            'online': went_online,
+            'changed': changed,
+            'offline': went_offline,
+            'online_count': online_count,
+            'held_count': held_count
+        }
+    
+    async def _process_online_streamer(self, vtb: VtbRecord, streamer_data: LiveEntry):
+        """处理在线主播（记录本身不修改，变化写入数据库后由监控列表副本更新）"""
+        start_time = streamer_data.start_time
+        usernick = streamer_data.user_nick
+        full_title = streamer_data.full_title
         
         # 检查是否有变化
         status_changed = False
         went_online = False
         
-        if usernick != vtb['usernick']:
-            self.db.update_vtb_column('usernick', usernick, vtb['mid'])
+        if usernick != vtb.usernick:
+            self._queue_update(vtb.mid, 'usernick', usernick)
             status_changed = True
         
-        if full_title != vtb['title']:
-            self.db.update_vtb_column('title', full_title, vtb['mid'])
+        if full_title != vtb.title:
+            self._queue_update(vtb.mid, 'title', full_title)
             status_changed = True
         
-        if start_time != vtb['liveStatus']:
-            self.db.update_vtb_column('liveStatus', start_time, vtb['mid'])
+        if start_time != vtb.live_status:
+            self._queue_update(vtb.mid, 'liveStatus', start_time)
             
             # 检查是否从离线变为在线
-            if vtb['liveStatus'] == '' or vtb['liveStatus'] is None:
+            if not vtb.live_status:
                 went_online = True
                 # 发送开播通知
                 self.notifier.notify_streamer_online(
-                    vtb['username'], usernick, full_title, start_time
+                    vtb.username, usernick, full_title, start_time
                 )
-                self._notify_status_change(f"[ONLINE] 主播 {vtb['mid']} 开播了！")
+                self._notify_status_change(f"[ONLINE] 主播 {vtb.mid} 开播了！")
             
             status_changed = True
         
-        # 更新内存中的数据
-        vtb.update({
-            'usernick': usernick,
-            'title': full_title,
-            'liveStatus': start_time
-        })
-        
         # 如果状态发生变化，通知UI更新
         if status_changed:
-            self._notify_status_change(f"[UPDATE] 主播 {vtb['mid']} 信息已更新")
+            self._notify_status_change(f"[UPDATE] 主播 {vtb.mid} 信息已更新")
     
-    async def _process_offline_streamer(self, vtb: Dict):
+    async def _process_offline_streamer(self, vtb: VtbRecord):
         """处理离线主播"""
-        if vtb['liveStatus'] and vtb['liveStatus'] != '':
+        if vtb.live_status:
             # 从在线变为离线
-            self.db.update_vtb_column('liveStatus', '', vtb['mid'])
-            self.notifier.notify_streamer_offline(vtb['username'], vtb['usernick'])
-            self._notify_status_change(f"[OFFLINE] 主播 {vtb['mid']} 下播了！")
-            vtb['liveStatus'] = ''
+            self._queue_update(vtb.mid, 'liveStatus', '')
+            self.notifier.notify_streamer_offline(vtb.username, vtb.usernick)
+            self._notify_status_change(f"[OFFLINE] 主播 {vtb.mid} 下播了！")
+    
+    def _queue_update(self, mid: str, column: str, value: str):
+        """记录一个待写入的主播字段变化，同一字段多次变化只保留最后的值"""
+        self._pending_updates.setdefault(mid, {})[column] = value
+    
+    def _take_pending_updates(self) -> List[Tuple[str, str, str]]:
+        """取出所有待写入的变化，返回(字段, 值, mid)列表"""
+        pending, self._pending_updates = self._pending_updates, {}
+        return [(column, value, mid) for mid, columns in pending.items() for column, value in columns.items()]
+    
+    async def flush_pending_updates(self) -> bool:
+        """在数据库线程中一次性提交待写入的变化（不阻塞事件循环）"""
+        updates = self._take_pending_updates()
+        if not updates:
+            return True
+        success = await self.db.run(self.db.update_vtb_columns, updates)
+        if not success:
+            error_msg = f"保存{len(updates)}项主播状态变化失败"
+            self.logger.error(error_msg)
+            self._notify_status_change(f"[ERROR] {error_msg}")
+        return success
     
     def start_monitoring(self):
         """启动监控"""
@@ -403,11 +1035,13 @@ class PandaLiveMonitor:
         self._notify_status_change(f"[SETTINGS] 监控配置: 检测间隔={self.check_interval}秒, 主循环间隔={self.main_interval}秒, 主播间间隔={self.streamer_interval}秒")
         
         # 记录代理使用状态
-        if self.proxy_enabled and self.proxy_url:
-            self._notify_status_change(f"[PROXY] 代理已启用: {self.proxy_url}")
+        if self.proxy_enabled and len(self.proxy_pool):
+            self._notify_status_change(f"[PROXY] 代理已启用: {', '.join(self.proxy_pool.get_urls())}")
         else:
             self._notify_status_change("[PROXY] 代理未启用，使用直连")
         
+        self.checked_generation = None
+        self._last_update_started = None
         self.is_running = True
         self.monitor_thread = threading.Thread(target=self._monitoring_loop, daemon=True)
         self.monitor_thread.start()
@@ -423,6 +1057,8 @@ class PandaLiveMonitor:
             
         self._notify_status_change("[STOP] 正在停止监控系统...")
         self.is_running = False
+        self.scheduler.wake()
+        self._cancel_current_job()
         
         # 强制将所有主播状态改为离线
         self._force_all_streamers_offline()
@@ -436,6 +1072,11 @@ class PandaLiveMonitor:
         
         self._notify_status_change("[STOP] 监控系统已完全停止")
     
+    def close(self):
+        """释放监控器资源：取消配置订阅并关闭HTTP客户端（需先停止监控）"""
+        self.db.settings.unsubscribe(self._on_tuning_config_changed)
+        self.http.close()
+    
     def _force_all_streamers_offline(self):
         """强制将所有主播状态改为离线"""
         try:
@@ -444,15 +1085,18 @@ class PandaLiveMonitor:
                 self._notify_status_change("[OFFLINE] 没有需要设置为离线的主播")
                 return
             
-            offline_count = 0
             self._notify_status_change(f"[OFFLINE] 正在强制设置 {len(watched_vtbs)} 个主播为离线状态...")
             
-            for vtb in watched_vtbs:
-                if vtb['liveStatus'] and vtb['liveStatus'] != '':
-                    # 只有当前在线的才需要设置为离线
-                    self.db.update_vtb_column('liveStatus', '', vtb['mid'])
-                    offline_count += 1
-                    self._notify_status_change(f"[OFFLINE] 主播 {vtb['mid']} 已设置为离线")
+            # 只有当前在线的才需要设置为离线
+            online_mids = [vtb.mid for vtb in watched_vtbs if vtb.live_status]
+            offline_count = len(online_mids)
+            if online_mids:
+                # 数据库线程按顺序执行，排在监控线程尚未提交的变化之后，一个事务完成
+                updates = [('liveStatus', '', mid) for mid in online_mids]
+                if not self.db.update_vtb_columns(updates):
+                    raise RuntimeError("数据库写入失败")
+                for mid in online_mids:
+                    self._notify_status_change(f"[OFFLINE] 主播 {mid} 已设置为离线")
             
             if offline_count > 0:
                 self._notify_status_change(f"[OK] 已强制设置 {offline_count} 个主播为离线状态")
@@ -464,60 +1108,162 @@ class PandaLiveMonitor:
             self.logger.error(error_msg)
             self._notify_status_change(f"[ERROR] {error_msg}")
     
+    def _cancel_current_job(self):
+        """取消正在执行的调度任务（可在任意线程调用）"""
+        loop = self._loop
+        if loop is None:
+            return
+        
+        def cancel():
+            if self._current_job is not None:
+                self._current_job.cancel()
+        
+        try:
+            loop.call_soon_threadsafe(cancel)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+    
+    async def _run_job(self, coro):
+        """以可取消的任务执行一个调度任务，停止监控时不必等待刷新或检测完成"""
+        task = asyncio.ensure_future(coro)
+        self._current_job = task
+        try:
+            await task
+        except asyncio.CancelledError:
+            if self.is_running:
+                raise
+            self._notify_status_change("[STOP] 已取消正在执行的任务")
+        finally:
+            self._current_job = None
+    
     def _monitoring_loop(self):
-        """监控主循环"""
+        """监控主循环（基于截止时间的调度器，停止或配置变化时立即唤醒）"""
         async def async_monitoring_loop():
-            update_cycle_count = 0
-            check_cycle_count = 0
-            last_update_time = 0
-            last_check_time = 0
+            self._loop = asyncio.get_running_loop()
+            self.scheduler.bind(self._loop)
+            self._update_cycle_count = 0
+            self._check_cycle_count = 0
+            self._last_check_time = None
+            self.is_idle = False
             
             # 程序启动时立即进行一次数据更新
             self._notify_status_change("[START] 程序启动，正在获取初始数据...")
-            await self.update_all_streamers_data()
-            last_update_time = time.time()
-            self.logger.info(f"初始数据更新完成，时间戳: {last_update_time}")
+            self.scheduler.schedule('update', self.scheduler.clock())
             
-            while self.is_running:
-                try:
-                    current_time = time.time()
-                    
-                    # 检查是否需要更新在线主播列表（更新间隔）
-                    if current_time - last_update_time >= self.main_interval:
-                        update_cycle_count += 1
-                        self._notify_status_change(f"🔄 开始第 {update_cycle_count} 轮数据更新...")
-                        self.logger.info(f"触发数据更新，第 {update_cycle_count} 轮")
-                        
-                        await self.update_all_streamers_data()
-                        last_update_time = current_time
-                        self._notify_status_change(f"[OK] 数据更新完成")
-                        self.logger.info(f"数据更新完成，下次更新时间: {last_update_time}")
-                    
-                    # 检查是否需要检测监控主播（检测间隔）
-                    if current_time - last_check_time >= self.check_interval:
-                        check_cycle_count += 1
-                        self._notify_status_change(f"[SEARCH] 开始第 {check_cycle_count} 轮主播检测...")
-                        self.logger.info(f"触发主播检测，第 {check_cycle_count} 轮")
+            error_count = 0
+            try:
+                while self.is_running:
+                    try:
+                        # 空闲模式下被唤醒（如添加了主播）时恢复数据更新
+                        if self.is_idle and self.scheduler.get_deadline('update') is None:
+                            self._resume_if_watching()
                         
-                        await self.check_watched_streamers()
-                        last_check_time = current_time
-                        self._notify_status_change(f"[OK] 主播检测完成")
-                        self.logger.info(f"主播检测完成，下次检测时间: {last_check_time}")
-                    
-                    # 简单等待1秒后重新检查
-                    await asyncio.sleep(1)
+                        for job in self.scheduler.pop_due():
+                            if not self.is_running:
+                                break
+                            if job == 'update':
+                                await self._run_job(self._run_update_job())
+                            elif job == 'check':
+                                await self._run_job(self._run_check_job())
                         
-                except Exception as e:
-                    error_msg = f"监控循环出错: {str(e)}"
-                    self.logger.error(error_msg)
-                    self._notify_status_change(f"[ERROR] {error_msg}")
-                    self._notify_status_change("⏳ 出错后等待30秒再继续...")
-                    await asyncio.sleep(30)  # 出错后等待30秒再继续
+                        error_count = 0
+                        if self.is_running:
+                            await self.scheduler.wait()
+                            
+                    except Exception as e:
+                        error_msg = f"监控循环出错: {str(e)}"
+                        self.logger.error(error_msg)
+                        self._notify_status_change(f"[ERROR] {error_msg}")
+                        # 出错后按指数退避等待再继续，期间可被停止请求唤醒
+                        error_count += 1
+                        delay = max(1.0, self.retry_policy.get_delay(error_count))
+                        self._notify_status_change(f"⏳ 出错后等待{delay:.1f}秒再继续...")
+                        if self.scheduler.get_deadline('update') is None:
+                            self.scheduler.schedule_in('update', delay)
+                        await self.scheduler.wait(timeout=delay)
+            finally:
+                self._loop = None
+                self.scheduler.unbind()
         
         # 运行异步循环
-        loop = asyncio.new_event_loop()
+        loop = self.loop_factory()
         asyncio.set_event_loop(loop)
-        loop.run_until_complete(async_monitoring_loop())
+        try:
+            loop.run_until_complete(async_monitoring_loop())
+        finally:
+            loop.close()
+    
+    async def _run_update_job(self):
+        """执行一轮数据更新，并按固定节拍安排下一轮"""
+        deadline = self.scheduler.clock()
+        
+        # 没有监控主播时进入空闲模式，不再定时唤醒
+        watched_vtbs = self.db.get_all_watched_vtbs()
+        if not watched_vtbs:
+            if not self.is_idle:
+                self.is_idle = True
+                self._notify_status_change("[IDLE] 没有需要监控的主播，进入空闲模式")
+                self.logger.info("没有监控主播，调度器进入空闲模式")
+            return
+        self.is_idle = False
+        
+        self._update_cycle_count += 1
+        self._notify_status_change(f"🔄 开始第 {self._update_cycle_count} 轮数据更新...")
+        self.logger.info(f"触发数据更新，第 {self._update_cycle_count} 轮")
+        
+        self._last_update_started = deadline
+        generation_before = self.snapshot_generation
+        await self.refresh_snapshot(watched_vtbs)
+        finished = self.scheduler.clock()
+        # 未设置Cookie时没有发出请求，不算更新失败，按正常间隔等待用户设置
+        refresh_failed = self.has_valid_cookie() and (
+            self.snapshot_generation == generation_before or bool(self.cached_data.get('partial'))
+        )
+        
+        # 按节拍计算下一次更新时间，避免漂移；若本轮超时则跳过错过的节拍，不会重叠执行
+        next_deadline = deadline + self.main_interval
+        if next_deadline <= finished:
+            missed = int((finished - deadline) // self.main_interval)
+            next_deadline = deadline + (missed + 1) * self.main_interval
+            self._notify_status_change(f"[WARNING] 数据更新耗时{finished - deadline:.2f}秒，超过更新间隔，跳过{missed}个节拍")
+            self.logger.warning(f"数据更新超时: 耗时{finished - deadline:.2f}秒, 跳过{missed}个节拍")
+        
+        # 更新失败或数据不完整时按退避时间尽快重试，而不是等待整个更新间隔
+        if refresh_failed:
+            self._consecutive_refresh_failures += 1
+            delay = max(self.retry_policy.get_delay(self._consecutive_refresh_failures),
+                        self.breaker.get_remaining_open_time(), 1.0)
+            if finished + delay < next_deadline:
+                next_deadline = finished + delay
+                self._notify_status_change(f"[RETRY] 数据更新未完成，{delay:.1f}秒后重试 (连续{self._consecutive_refresh_failures}次)")
+        else:
+            self._consecutive_refresh_failures = 0
+        
+        if self.scheduler.get_deadline('update') is None:
+            self.scheduler.schedule('update', next_deadline)
+        self.logger.info(f"数据更新完成，{next_deadline - finished:.1f}秒后进行下一轮")
+        
+        # 有新数据时立即检测
+        if self.has_pending_check():
+            self.scheduler.schedule('check', finished)
+    
+    async def _run_check_job(self):
+        """执行一轮主播检测"""
+        self._last_check_time = self.scheduler.clock()
+        if await self.check_watched_streamers():
+            self._check_cycle_count += 1
+            self._notify_status_change(f"[OK] 第 {self._check_cycle_count} 轮主播检测完成")
+            self.logger.info(f"主播检测完成，第 {self._check_cycle_count} 轮，数据版本: {self.checked_generation}")
+    
+    def _resume_if_watching(self):
+        """空闲模式下检查是否有了监控主播，有则立即恢复数据更新"""
+        if self.db.get_watched_count():
+            self.is_idle = False
+            self._notify_status_change("[START] 检测到监控主播，退出空闲模式")
+            # 缓存数据可能已过时，更新完成后会自动触发检测
+            self.scheduler.cancel('check')
+            self.scheduler.schedule('update', self.scheduler.clock())
     
     async def add_streamer(self, mid: str, remark: str = "") -> tuple:
         """添加主播到监控列表"""
@@ -525,39 +1271,35 @@ class PandaLiveMonitor:
             self._notify_status_change(f"[SEARCH] 开始添加主播 {mid} 到监控列表...")
             
             # 检查是否已在监控列表中
-            existing = self.db.get_vtb_by_mid(mid)
-            if existing and self.db.get_all_watched_vtbs():
-                watched_mids = [vtb['mid'] for vtb in self.db.get_all_watched_vtbs()]
-                if mid in watched_mids:
-                    self._notify_status_change(f"[WARNING] 主播 {mid} 已在监控列表中")
-                    return False, f"主播 {mid} 已在监控列表中"
-            
-            self._notify_status_change(f"📡 正在获取主播 {mid} 的详细信息...")
+            if self.db.is_watched(mid):
+                self._notify_status_change(f"[WARNING] 主播 {mid} 已在监控列表中")
+                return False, f"主播 {mid} 已在监控列表中"
             
-            # 获取主播信息
-            streamer_info = await self.fetch_streamer_info(mid)
-            if not streamer_info or not streamer_info.get('result'):
-                self._notify_status_change(f"[ERROR] 无法获取主播 {mid} 的信息")
-                return False, f"无法获取主播 {mid} 的信息"
-            
-            media_data = streamer_info.get('media', {})
-            start_time = media_data.get('startTime', '')
-            title = media_data.get('title', '')
-            usernick = media_data.get('userNick', '')
-            
-            self._notify_status_change(f"[LIST] 主播 {mid} 信息获取成功: 昵称={usernick}, 标题={title[:30]}...")
+            # 主播当前在线时直接使用缓存数据，无需再请求接口
+            entry = self.get_live_entry(mid)
+            if entry:
+                self._notify_status_change(f"[LIST] 主播 {mid} 当前在线，使用缓存数据")
+            else:
+                self._notify_status_change(f"📡 正在获取主播 {mid} 的详细信息...")
+                
+                # 获取主播信息
+                streamer_info = await self._fetch_with_retry(self.fetch_streamer_info, mid, description=f"主播{mid}")
+                if not streamer_info or not streamer_info.get('result'):
+                    self._notify_status_change(f"[ERROR] 无法获取主播 {mid} 的信息")
+                    return False, f"无法获取主播 {mid} 的信息"
+                
+                entry = LiveEntry.from_api(streamer_info.get('media') or {})
+            start_time = entry.start_time
+            usernick = entry.user_nick
+            full_title = entry.full_title
             
-            # 构建完整标题
-            live_type = "🎥" if media_data.get('liveType') == "rec" else ""
-            is_pw = "🔒" if media_data.get('isPw') else ""
-            is_adult = "🔞" if media_data.get('isAdult') else ""
-            fan_type = "💰" if media_data.get('type') == "fan" else ""
-            full_title = f"{live_type}{fan_type}{is_pw}{is_adult}{title}"
+            self._notify_status_change(f"[LIST] 主播 {mid} 信息获取成功: 昵称={usernick}, 标题={entry.title[:30]}...")
             
             self._notify_status_change(f"💾 正在将主播 {mid} 添加到数据库...")
             
-            # 添加到数据库
-            success = self.db.add_vtb_to_watch(
+            # 添加到数据库（在数据库线程中执行，不阻塞事件循环）
+            success = await self.db.run(
+                self.db.add_vtb_to_watch,
                 mid=mid,
                 username=mid,
                 usernick=usernick,
@@ -569,6 +1311,8 @@ class PandaLiveMonitor:
             )
             
             if success:
+                # 监控列表变化，下次检查时重新处理当前缓存数据
+                self.request_check()
                 self._notify_status_change(f"[OK] 主播 {mid} 添加成功")
                 return True, f"成功添加主播 {mid}"
             else:
@@ -637,7 +1381,7 @@ class PandaLiveMonitor:
         
         # 只有在监控运行时才计算在线/离线数量
         if self.is_running:
-            online_count = len([vtb for vtb in watched_vtbs if vtb['liveStatus']])
+            online_count = len([vtb for vtb in watched_vtbs if vtb.live_status])
             offline_count = len(watched_vtbs) - online_count
         else:
             # 监控未运行时，不显示在线/离线数量（因为数据可能过时）
@@ -652,7 +1396,26 @@ class PandaLiveMonitor:
             'check_interval': self.check_interval,
             'main_interval': self.main_interval,
             'streamer_interval': self.streamer_interval,
+            'page_concurrency': self.page_concurrency,
+            'page_size': {
+                'current': self.batch_size,
+                'min': self.page_size_min,
+                'max': self.page_size_max,
+                'model': self.page_size_model
+            },
+            'full_sweep_every': self.full_sweep_every,
+            'last_plan': self.last_plan,
+            'breaker': self.breaker.get_stats(),
+            'hedge_enabled': self.hedge_enabled,
+            'hedge_stats': dict(self.hedge_stats),
+            'snapshot_generation': self.snapshot_generation,
+            'is_idle': self.is_idle,
             'has_cookie': bool(self.get_cookie() and self.get_cookie() != "Your Cookie"),
+            'cookie_pool': self.cookie_pool.get_stats(),
+            'api_base_url': self.api_base_url,
             'proxy_enabled': self.proxy_enabled,
-            'proxy_url': self.proxy_url
+            'proxy_url': self.proxy_url,
+            'proxy_pool': self.proxy_pool.get_stats(),
+            'http_stats': self.http.get_stats(),
+            'database': self.db.get_executor_stats()
         }
@@ -0,0 +1,157 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+def normalize_proxy_url(url: str) -> str:
+    """补全代理URL的协议前缀"""
+    url = url.strip()
+    if url and not url.startswith(('http://', 'https://', 'socks5://', 'socks5h://')):
+        url = f"http://{url}"
+    return url
+
+def parse_proxy_list(text: str) -> List[str]:
+    """解析以逗号、分号或换行分隔的代理列表（去重，保持顺序）"""
+    urls = []
+    for part in text.replace(';', ',').replace('\n', ',').split(','):
+        url = normalize_proxy_url(part)
+        if url and url not in urls:
+            urls.append(url)
+    return urls
+
+class ProxyState:
+    """单个代理的健康状态"""
+    __slots__ = ('url', 'latency', 'error_rate', 'in_flight', 'consecutive_failures',
+                 'ejected_until', 'eject_count', 'probing', 'successes', 'failures')
+
+    def __init__(self, url: str):
+        """初始化代理状态"""
+        self.url = url
+        self.latency = None  # 耗时的指数加权平均（秒），None表示尚未测量
+        self.error_rate = 0.0  # 失败率的指数加权平均
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.eject_count = 0
+        self.probing = False
+        self.successes = 0
+        self.failures = 0
+
+class ProxyPool:
+    def __init__(self, urls: Iterable[str] = (), failure_threshold: int = 3, eject_timeout: float = 30.0,
+                 max_eject_timeout: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        """初始化代理池：按耗时和失败率选择最健康的代理，连续失败的代理暂时剔除，到期后放行一个请求重新探测"""
+        self.failure_threshold = max(1, failure_threshold)
+        self.eject_timeout = eject_timeout
+        self.max_eject_timeout = max_eject_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._proxies: Dict[str, ProxyState] = {}
+        self.set_urls(urls)
+
+    def set_urls(self, urls: Iterable[str]):
+        """更新代理列表，保留仍在列表中的代理的统计信息"""
+        with self._lock:
+            proxies = {}
+            for url in urls:
+                url = normalize_proxy_url(url)
+                if url and url not in proxies:
+                    proxies[url] = self._proxies.get(url) or ProxyState(url)
+            self._proxies = proxies
+
+    def get_urls(self) -> List[str]:
+        """获取代理列表"""
+        with self._lock:
+            return list(self._proxies)
+
+    def __len__(self) -> int:
+        return len(self._proxies)
+
+    def _score(self, state: ProxyState) -> float:
+        """代理得分（越小越好）：耗时按并发中的请求数放大，并按失败率加罚"""
+        if state.latency is None:
+            # 尚未测量的代理优先尝试
+            return 0.0
+        return state.latency * (1 + state.in_flight) * (1 + 4 * state.error_rate)
+
+    def acquire(self) -> Optional[str]:
+        """选择一个代理用于本次请求，请求结束后需调用release"""
+        with self._lock:
+            if not self._proxies:
+                return None
+            now = self.clock()
+            candidates = []
+            for state in self._proxies.values():
+                if state.ejected_until > now:
+                    continue
+                if state.ejected_until:
+                    # 剔除期已过：只放行一个请求重新探测
+                    if state.probing:
+                        continue
+                    state.probing = True
+                    state.in_flight += 1
+                    return state.url
+                candidates.append(state)
+
+            if candidates:
+                state = min(candidates, key=self._score)
+            else:
+                # 所有代理都被剔除时使用最早到期的代理，而不是静默改为直连
+                state = min(self._proxies.values(), key=lambda item: item.ejected_until)
+            state.in_flight += 1
+            return state.url
+
+    def release(self, url: Optional[str], elapsed: float, success: Optional[bool]):
+        """记录代理的请求结果（success为None表示请求被取消，不计入统计）"""
+        if url is None:
+            return
+        with self._lock:
+            state = self._proxies.get(url)
+            if state is None:
+                return
+            state.in_flight = max(0, state.in_flight - 1)
+            was_probing = state.probing
+            state.probing = False
+            if success is None:
+                return
+            state.error_rate = state.error_rate * 0.8 + (0.0 if success else 0.2)
+
+            if success:
+                state.successes += 1
+                state.consecutive_failures = 0
+                state.latency = elapsed if state.latency is None else state.latency * 0.8 + elapsed * 0.2
+                if state.ejected_until:
+                    # 探测成功，恢复使用
+                    state.ejected_until = 0.0
+                    state.eject_count = 0
+                return
+
+            state.failures += 1
+            state.consecutive_failures += 1
+            if was_probing or state.consecutive_failures >= self.failure_threshold:
+                timeout = min(self.max_eject_timeout, self.eject_timeout * (2 ** state.eject_count))
+                state.ejected_until = self.clock() + timeout
+                state.eject_count += 1
+
+    def is_ejected(self, url: str) -> bool:
+        """代理当前是否被剔除"""
+        with self._lock:
+            state = self._proxies.get(url)
+            return bool(state and state.ejected_until > self.clock())
+
+    def get_stats(self) -> List[Dict]:
+        """获取每个代理的统计信息"""
+        with self._lock:
+            now = self.clock()
+            return [
+                {
+                    'url': state.url,
+                    'latency': state.latency,
+                    'error_rate': round(state.error_rate, 3),
+                    'in_flight': state.in_flight,
+                    'successes': state.successes,
+                    'failures': state.failures,
+                    'ejected': state.ejected_until > now,
+                    'reprobe_in': max(0.0, state.ejected_until - now) if state.ejected_until else 0.0
+                }
+                for state in self._proxies.values()
+            ]
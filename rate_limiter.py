@@ -0,0 +1,127 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict
+
+# 优先级（数值越小越优先）
+PRIORITY_INTERACTIVE = 0  # 界面触发的查询
+PRIORITY_PROBE = 1  # 逐个探测主播
+PRIORITY_BACKGROUND = 2  # 后台刷新列表分页
+
+def _resolve(future: asyncio.Future):
+    """在等待者所属的事件循环中唤醒它"""
+    if not future.done():
+        future.set_result(None)
+
+class RateLimiter:
+    def __init__(self, rate: float = 5.0, burst: int = 10, clock: Callable[[], float] = time.monotonic):
+        """初始化令牌桶限流器（进程内共享，可跨线程、跨事件循环使用）"""
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._waiters = []  # (优先级, 序号, 事件循环, future)
+        self._counter = itertools.count()
+        self._timer = None
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = clock()
+
+        # 统计信息
+        self.granted = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+
+    def configure(self, rate: float, burst: int):
+        """更新限流参数（rate <= 0 表示不限流）"""
+        with self._lock:
+            self._refill()
+            self.rate = rate
+            self.burst = max(1, burst)
+            self._tokens = min(self._tokens, float(self.burst))
+            self._dispatch()
+
+    def _refill(self):
+        """按流逝时间补充令牌（调用方需持有锁）"""
+        now = self.clock()
+        if self.rate > 0:
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        else:
+            self._tokens = float(self.burst)
+        self._updated = now
+
+    def _dispatch(self):
+        """把可用令牌按优先级分给等待者，令牌不足时安排定时器（调用方需持有锁）"""
+        self._refill()
+        while self._waiters and (self.rate <= 0 or self._tokens >= 1):
+            _, _, loop, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            if self.rate > 0:
+                self._tokens -= 1
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                # 等待者的事件循环已关闭
+                pass
+
+        if self._waiters and self._timer is None:
+            delay = max(0.001, (1 - self._tokens) / self.rate)
+            self._timer = threading.Timer(delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self):
+        """定时器到期后继续分配令牌"""
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    async def acquire(self, priority: int = PRIORITY_BACKGROUND) -> float:
+        """获取一个令牌，返回等待时间（秒）；优先级高的等待者先拿到令牌"""
+        start_time = self.clock()
+        with self._lock:
+            self._refill()
+            if not self._waiters and (self.rate <= 0 or self._tokens >= 1):
+                if self.rate > 0:
+                    self._tokens -= 1
+                self.granted += 1
+                return 0.0
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            heapq.heappush(self._waiters, (priority, next(self._counter), loop, future))
+            self._dispatch()
+
+        await future
+        waited = self.clock() - start_time
+        with self._lock:
+            self.granted += 1
+            self.delayed += 1
+            self.total_wait += waited
+        return waited
+
+    def get_stats(self) -> Dict:
+        """获取限流统计信息"""
+        with self._lock:
+            self._refill()
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'tokens': round(self._tokens, 2),
+                'queue_depth': sum(1 for waiter in self._waiters if not waiter[3].done()),
+                'granted': self.granted,
+                'delayed': self.delayed,
+                'total_wait': self.total_wait
+            }
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+def get_shared_limiter() -> RateLimiter:
+    """获取进程内共享的限流器"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
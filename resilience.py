@@ -0,0 +1,109 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0):
+        """初始化重试策略（带随机抖动的指数退避）"""
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def get_delay(self, attempt: int) -> float:
+        """获取第attempt次失败后的等待时间（full jitter）"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** max(0, attempt - 1)))
+        return random.uniform(0, ceiling)
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """初始化熔断器：连续失败达到阈值后熔断，超时后放行一个探测请求"""
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.open_count = 0
+        self._probe_in_flight = False
+        self._generation = 0  # 每次熔断打开时递增，用于识别打开前放行的请求
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> Optional[Tuple[int, bool]]:
+        """当前是否允许发出请求：允许时返回请求凭证(熔断代数, 是否为探测请求)，否则返回None"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return (self._generation, False)
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return None
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # 半开状态下只放行一个探测请求
+            if self._probe_in_flight:
+                return None
+            self._probe_in_flight = True
+            return (self._generation, True)
+
+    def record_success(self, token: Tuple[int, bool]) -> bool:
+        """记录一次成功请求，返回熔断器是否因此恢复；熔断打开前放行的请求结果不影响熔断状态"""
+        generation, is_probe = token
+        with self._lock:
+            if generation != self._generation:
+                return False
+            if self.state == self.CLOSED:
+                self.consecutive_failures = 0
+                return False
+            if not is_probe:
+                return False
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+            return True
+
+    def record_failure(self, token: Tuple[int, bool]) -> bool:
+        """记录一次失败请求，返回熔断器是否因此打开"""
+        generation, is_probe = token
+        with self._lock:
+            if generation != self._generation or (self.state == self.HALF_OPEN and not is_probe):
+                return False
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self.open_count += 1
+                # 之前放行的请求凭证全部作废
+                self._generation += 1
+                return True
+            return False
+
+    def release(self, token: Tuple[int, bool]):
+        """请求被取消、没有结果时归还凭证，半开状态下允许再放行一个探测请求"""
+        generation, is_probe = token
+        with self._lock:
+            if is_probe and generation == self._generation and self.state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def get_remaining_open_time(self) -> float:
+        """熔断打开时距离放行探测请求的剩余时间"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+    def get_stats(self) -> Dict:
+        """获取熔断器状态"""
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'open_count': self.open_count
+            }
@@ -0,0 +1,106 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+class DeadlineScheduler:
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """初始化调度器（按单调时钟截止时间排序的优先队列）"""
+        self.clock = clock
+        self._heap = []
+        self._counter = itertools.count()
+        self._deadlines: Dict[str, float] = {}  # 任务名 -> 当前有效的截止时间
+        self._lock = threading.Lock()
+        self._loop = None
+        self._event = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """绑定到运行调度的事件循环"""
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def unbind(self):
+        """解除与事件循环的绑定并清空任务"""
+        with self._lock:
+            self._heap.clear()
+            self._deadlines.clear()
+        self._loop = None
+        self._event = None
+
+    def schedule(self, name: str, deadline: float):
+        """安排任务在指定截止时间执行，同名任务只保留最新的截止时间"""
+        with self._lock:
+            self._deadlines[name] = deadline
+            heapq.heappush(self._heap, (deadline, next(self._counter), name))
+        self.wake()
+
+    def schedule_in(self, name: str, delay: float):
+        """安排任务在delay秒后执行"""
+        self.schedule(name, self.clock() + max(0.0, delay))
+
+    def cancel(self, name: str):
+        """取消任务"""
+        with self._lock:
+            self._deadlines.pop(name, None)
+        self.wake()
+
+    def get_deadline(self, name: str) -> Optional[float]:
+        """获取任务当前的截止时间"""
+        with self._lock:
+            return self._deadlines.get(name)
+
+    def _discard_stale(self):
+        """丢弃已被取消或重新安排的堆顶条目（调用方需持有锁）"""
+        while self._heap:
+            deadline, _, name = self._heap[0]
+            if self._deadlines.get(name) == deadline:
+                return
+            heapq.heappop(self._heap)
+
+    def next_deadline(self) -> Optional[float]:
+        """获取最近的截止时间，没有任务时返回None"""
+        with self._lock:
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self) -> List[str]:
+        """取出所有已到期的任务，按截止时间先后排序"""
+        now = self.clock()
+        due = []
+        with self._lock:
+            while True:
+                self._discard_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, _, name = heapq.heappop(self._heap)
+                self._deadlines.pop(name, None)
+                due.append(name)
+        return due
+
+    def wake(self):
+        """立即唤醒等待中的调度循环（可在任意线程调用）"""
+        loop, event = self._loop, self._event
+        if loop is None or event is None:
+            return
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    async def wait(self, timeout: Optional[float] = None):
+        """等待到下一个截止时间或被唤醒；没有任务时一直等待直到被唤醒"""
+        deadline = self.next_deadline()
+        if deadline is not None:
+            delay = max(0.0, deadline - self.clock())
+            timeout = delay if timeout is None else min(timeout, delay)
+        if self._event.is_set():
+            self._event.clear()
+            return
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._event.clear()
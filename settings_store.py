@@ -0,0 +1,113 @@
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# 配置项默认值，类型即该配置项的类型（数据库中统一以字符串保存）
+CONFIG_DEFAULTS: Dict[str, Any] = {
+    'cookie': '',
+    'cookie_pool': '',
+    'api_base_url': 'https://api.pandalive.co.kr',
+    'check_interval': 2,
+    'main_interval': 60,
+    'streamer_interval': 5,
+    'page_concurrency': 4,
+    'full_sweep_every': 10,
+    'page_size_min': 48,
+    'page_size_max': 192,
+    'retry_attempts': 3,
+    'breaker_threshold': 5,
+    'breaker_reset_timeout': 30.0,
+    'rate_limit_rps': 5.0,
+    'rate_limit_burst': 10,
+    'hedge_enabled': False,
+    'hedge_max_fraction': 0.1,
+    'theme': 'dark',
+    'proxy_enabled': False,
+    'proxy_url': '',
+    'proxy_pool': '',
+    'online_notification': True,
+    'offline_notification': True
+}
+
+def format_config_value(value: Any) -> str:
+    """把配置值转换为数据库中保存的字符串"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def parse_config_value(key: str, raw: str) -> Any:
+    """按默认值的类型解析配置项，无法解析时返回默认值"""
+    default = CONFIG_DEFAULTS.get(key)
+    if default is None or raw is None:
+        return raw if default is None else default
+    try:
+        if isinstance(default, bool):
+            return raw.strip().lower() == 'true'
+        if isinstance(default, int):
+            return int(raw)
+        if isinstance(default, float):
+            return float(raw)
+        return raw
+    except ValueError:
+        print(f"[WARNING] 配置项 {key} 的值无效: {raw!r}，使用默认值 {default!r}")
+        return default
+
+class SettingsStore:
+    def __init__(self, values: Optional[Dict[str, str]] = None):
+        """初始化配置的内存副本：读取不访问数据库，值变化时通知订阅者"""
+        self._lock = threading.Lock()
+        self._raw: Dict[str, str] = {}
+        self._typed: Dict[str, Any] = {}
+        self._subscribers: List[Tuple[Callable[[str, Any], None], Optional[frozenset]]] = []
+        if values:
+            self.load(values)
+
+    def load(self, values: Dict[str, str]):
+        """用数据库中的全部配置替换内存副本（不通知订阅者）"""
+        with self._lock:
+            self._raw = dict(values)
+            self._typed = {key: parse_config_value(key, raw) for key, raw in self._raw.items()}
+
+    def get_raw(self, key: str, default: str = "") -> str:
+        """获取配置项的原始字符串"""
+        return self._raw.get(key, default)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """获取按类型解析后的配置项，不存在时返回default或该项的默认值"""
+        if key in self._typed:
+            return self._typed[key]
+        return CONFIG_DEFAULTS.get(key) if default is None else default
+
+    def snapshot(self) -> Dict[str, str]:
+        """获取所有配置项的原始字符串"""
+        with self._lock:
+            return dict(self._raw)
+
+    def update(self, key: str, raw: str) -> bool:
+        """更新一个配置项（数据库写入成功后调用），值有变化时通知订阅者，返回是否有变化"""
+        with self._lock:
+            if self._raw.get(key) == raw:
+                return False
+            self._raw[key] = raw
+            value = self._typed[key] = parse_config_value(key, raw)
+            subscribers = list(self._subscribers)
+
+        for callback, keys in subscribers:
+            if keys is not None and key not in keys:
+                continue
+            try:
+                callback(key, value)
+            except Exception as e:
+                print(f"配置变化通知失败: {e}")
+        return True
+
+    def subscribe(self, callback: Callable[[str, Any], None], keys: Optional[Iterable[str]] = None):
+        """订阅配置变化，keys为None时订阅所有配置项；回调在数据库线程中执行"""
+        with self._lock:
+            self._subscribers.append((callback, frozenset(keys) if keys is not None else None))
+
+    def unsubscribe(self, callback: Callable[[str, Any], None]):
+        """取消订阅"""
+        with self._lock:
+            self._subscribers = [item for item in self._subscribers if item[0] != callback]
@@ -0,0 +1,50 @@
+import sys
+from typing import Sequence
+
+# 数据库列名 -> 记录属性名
+COLUMN_ATTRIBUTES = {
+    'mid': 'mid',
+    'username': 'username',
+    'usernick': 'usernick',
+    'liveStatus': 'live_status',
+    'title': 'title',
+    'platform': 'platform',
+    'hls': 'hls',
+    'remark': 'remark'
+}
+
+def _intern(value) -> str:
+    """驻留字符串，NULL按空字符串处理"""
+    if value is None:
+        return ''
+    return sys.intern(value if isinstance(value, str) else str(value))
+
+class VtbRecord:
+    """监控主播记录（vtbs表的一行），创建后不再修改，字段变化时用replace生成新记录"""
+    __slots__ = ('mid', 'username', 'usernick', 'live_status', 'title', 'platform', 'hls', 'remark')
+
+    def __init__(self, mid: str, username: str, usernick: str = "", live_status: str = "", title: str = "",
+                 platform: str = "panda", hls: str = "", remark: str = ""):
+        """初始化主播记录"""
+        self.mid = _intern(mid)
+        self.username = _intern(username)
+        self.usernick = _intern(usernick)
+        self.live_status = _intern(live_status)
+        self.title = _intern(title)
+        self.platform = _intern(platform)
+        self.hls = _intern(hls)
+        self.remark = _intern(remark)
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> 'VtbRecord':
+        """从vtbs表的一行创建记录"""
+        return cls(*row[:8])
+
+    def replace(self, **changes) -> 'VtbRecord':
+        """返回修改了部分字段的新记录"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return VtbRecord(**values)
+
+    def __repr__(self) -> str:
+        return f"VtbRecord(mid={self.mid!r}, live_status={self.live_status!r}, usernick={self.usernick!r})"